@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Compare pg.ReverbPE against giantfish's partitioned FFT convolution on the
+10 second synthetic IR used by score.py.
+"""
+import argparse
+
+import numpy as np
+import pygmu2 as pg
+
+from giantfish.bench import time_render
+from giantfish.buffer_pe import BufferPE
+from giantfish.convolution_pe import DEFAULT_PARTITION_SIZE, PartitionedConvolutionPE
+
+SAMPLE_RATE = 44100
+pg.set_sample_rate(SAMPLE_RATE)
+
+IR_10_PATH = "data/assets/impulses/synthetic_ir_10.wav"
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--seconds",
+        type=float,
+        default=30.0,
+        help="Length of source material to render (default: 30).")
+    parser.add_argument(
+        "--partition-size",
+        type=int,
+        default=DEFAULT_PARTITION_SIZE,
+        help=f"Partition size in samples (default: {DEFAULT_PARTITION_SIZE}).")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    n = int(args.seconds * SAMPLE_RATE)
+    rng = np.random.default_rng(20260210)
+    src = BufferPE(0.1 * rng.standard_normal((n, 2)).astype(np.float32))
+    ir = pg.WavReaderPE(IR_10_PATH)
+    duration = n + ir.extent().duration
+
+    print(f"{args.seconds:.1f} s stereo noise through {IR_10_PATH}")
+    reference = time_render(
+        "pg.ReverbPE", pg.ReverbPE(src, ir, mix=0.6), duration, SAMPLE_RATE,
+        label_width=24)
+    candidate = time_render(
+        f"PartitionedConvolutionPE({args.partition_size})",
+        PartitionedConvolutionPE(src, ir, mix=0.6, partition_size=args.partition_size),
+        duration, SAMPLE_RATE, label_width=24)
+    print(f"max abs difference: {np.max(np.abs(reference - candidate)):.3g}")
+
+
+if __name__ == "__main__":
+    main()
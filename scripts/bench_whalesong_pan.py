@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Compare per-sample panning of the whalesong track (pg.SpatialConstantPower
+driven by a per-sample random walk, as score.py used to do) against
+giantfish's ConstantPowerPanPE driven by a control-rate walk.
+"""
+import argparse
+
+import numpy as np
+import pygmu2 as pg
+
+from giantfish.bench import time_render
+from giantfish.buffer_pe import BufferPE
+from giantfish.control_rate import DEFAULT_CONTROL_PERIOD, ControlRatePE
+from giantfish.panner import ConstantPowerPanPE
+from giantfish.render import render_to_array
+
+SAMPLE_RATE = 44100
+pg.set_sample_rate(SAMPLE_RATE)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--seconds",
+        type=float,
+        default=115 * 1.5,
+        help="Length of material to render (default: the whole piece).")
+    parser.add_argument(
+        "--period",
+        type=int,
+        default=DEFAULT_CONTROL_PERIOD,
+        help=f"Control period in samples (default: {DEFAULT_CONTROL_PERIOD}).")
+    return parser.parse_args()
+
+
+def _walk_ticks(n, period, slew, rng):
+    """
+    A bounded random walk in degrees with one value per control tick, at
+    samples 0, period, 2 * period, ... up to the first tick at or past the
+    last sample n - 1, so every sample lies between two ticks.
+    """
+    count = -(-(n - 1) // period) + 1
+    steps = rng.uniform(-slew, slew, count) * 160.0
+    steps[0] = 0.0
+    return np.clip(np.cumsum(steps), -80.0, 80.0).astype(np.float32)
+
+
+def main() -> None:
+    args = _parse_args()
+    n = int(args.seconds * SAMPLE_RATE)
+    rng = np.random.default_rng(20260210)
+    # The whalesong slices aren't needed to time panning; noise will do.
+    src = BufferPE(0.1 * rng.standard_normal((n, 2)).astype(np.float32))
+
+    def walk(slew):
+        return pg.RandomPE(
+            min_value=-80.0, max_value=80.0, mode=pg.RandomMode.WALK, slew=slew)
+
+    # One step per period needs sqrt(period) times the per-sample slew to
+    # wander as far, see score.py.
+    control_slew = 0.001 * np.sqrt(args.period)
+    print(f"{args.seconds:.1f} s of stereo noise, control period {args.period}")
+    time_render(
+        "SpatialConstantPower, per sample",
+        pg.SpatialPE(src, method=pg.SpatialConstantPower(azimuth=walk(0.001))),
+        n, SAMPLE_RATE)
+    time_render(
+        "ConstantPowerPanPE, per sample",
+        ConstantPowerPanPE(src, azimuth=walk(0.001)),
+        n, SAMPLE_RATE)
+    time_render(
+        "ConstantPowerPanPE, control rate",
+        ConstantPowerPanPE(
+            src, azimuth=ControlRatePE(walk(control_slew), args.period)),
+        n, SAMPLE_RATE)
+
+    # Equivalence: one seeded walk, sampled at the control ticks, drives both
+    # the old panner (per sample, through the linearly interpolated curve a
+    # ControlRatePE renders to) and the new one (gains per tick).
+    ticks = _walk_ticks(n, args.period, control_slew, rng)
+    azimuth = np.interp(
+        np.arange(n), np.arange(len(ticks)) * args.period, ticks).astype(np.float32)
+    old = render_to_array(
+        pg.SpatialPE(src, method=pg.SpatialConstantPower(azimuth=BufferPE(azimuth))),
+        0, n, SAMPLE_RATE)
+    per_sample = render_to_array(
+        ConstantPowerPanPE(src, azimuth=BufferPE(azimuth)), 0, n, SAMPLE_RATE)
+    control_rate = render_to_array(
+        ConstantPowerPanPE(src, azimuth=ControlRatePE(BufferPE(ticks), args.period)),
+        0, n, SAMPLE_RATE)
+    print("max abs difference from SpatialConstantPower, same walk:")
+    print(f"  ConstantPowerPanPE, per sample:   {np.max(np.abs(old - per_sample)):.3g}")
+    print(f"  ConstantPowerPanPE, control rate: {np.max(np.abs(old - control_rate)):.3g}")
+
+
+if __name__ == "__main__":
+    main()
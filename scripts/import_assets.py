@@ -2,6 +2,7 @@
 
 import json
 import pygmu2 as pg
+from giantfish.preview import preview
 from pygmu2.asset_manager import AssetManager, GoogleDriveAssetLoader
 
 pg.set_sample_rate(44100)
@@ -12,13 +13,6 @@ logger = get_logger(__name__)
 
 SAMPLE_RATE = 44100
 
-def _play(source, sample_rate):
-    renderer = pg.AudioRenderer(sample_rate=sample_rate)
-    renderer.set_source(source)
-    with renderer:
-        renderer.start()
-        renderer.play_extent()
-
 def _import_wav_reader(asset_name):
     """
     Download a remote .wav file and return a WavReaderPE for it, coercing to
@@ -229,7 +223,8 @@ if __name__ == "__main__":
     def audition_slices(pe_dict):
         """
         pe_dict: dict[str, ProcessingElement]
-        Uses _play(pe) to audition the selected PE.
+        Uses preview(pe) to audition the selected PE, rendering ahead on a
+        worker thread so long reverbs and compressors don't underrun.
         """
         names = list(pe_dict.keys())
 
@@ -254,14 +249,14 @@ if __name__ == "__main__":
                 idx = int(choice)
                 if 1 <= idx <= len(names):
                     name = names[idx - 1]
-                    _play(pe_dict[name], SAMPLE_RATE)
+                    preview(pe_dict[name], SAMPLE_RATE)
                 else:
                     print("Invalid number.")
                 continue
 
             # name choice
             if choice in pe_dict:
-                _play(pe_dict[choice], SAMPLE_RATE)
+                preview(pe_dict[choice], SAMPLE_RATE)
             else:
                 print("Unknown name. Enter '?' for list.")
 
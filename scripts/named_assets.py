@@ -1,4 +1,10 @@
 from giantfish.config import ASSETS_DIR
+from giantfish.manifest import ManifestAssetManager, drive_files
+from giantfish.prefetch import prefetch_assets
+from giantfish.preview import preview
+from giantfish.registry import LazyRegistry
+from giantfish.resample_cache import resampled_path
+from giantfish.wavfile import MmapWavReaderPE, read_wav_info
 import json
 import pygmu2 as pg
 from pygmu2.asset_manager import AssetManager, GoogleDriveAssetLoader
@@ -13,6 +19,56 @@ logger = get_logger(__name__)
 
 SAMPLE_RATE = 44100
 
+# Every registry created by this module, for touched_assets()
+_REGISTRIES: list[LazyRegistry] = []
+
+def _make_registry(name:str, prefetcher=None) -> LazyRegistry:
+    registry = LazyRegistry(name, prefetcher=prefetcher)
+    _REGISTRIES.append(registry)
+    return registry
+
+def _lazy_asset_manager(folder_id:str, check_remote:bool = False) -> ManifestAssetManager:
+    """
+    Return an asset manager for folder_id that resolves cached assets from
+    the local asset manifest, and only creates the Google Drive backed
+    AssetManager for assets the manifest doesn't have.  The manifest records
+    each asset's Drive file id and version when a Drive OAuth client is set
+    up (see giantfish.manifest.drive_files()); with check_remote, assets
+    that have changed on Drive since they were fetched are fetched again.
+    """
+    def make_asset_manager():
+        # oauth_client_secrets may be omitted if stored at the default config path.
+        asset_loader = GoogleDriveAssetLoader(folder_id=folder_id)
+        return AssetManager(asset_loader=asset_loader)
+    return ManifestAssetManager(
+        folder_id,
+        make_asset_manager,
+        remote_files=drive_files(folder_id),
+        check_remote=check_remote)
+
+def _open_stereo_wav(path) -> pg.ProcessingElement:
+    """
+    Memory-map a .wav file as a stereo stream.  Long field recordings are
+    served straight from the page cache rather than read into memory.  Files
+    not at SAMPLE_RATE are resampled once and read from the resample cache.
+    """
+    path = resampled_path(path, SAMPLE_RATE)
+    info = read_wav_info(path)
+    if info.channels <= 2:
+        stream = MmapWavReaderPE(path, channels=2)
+    else:
+        # Coerce to stereo
+        stream = pg.SpatialPE(MmapWavReaderPE(path), method=pg.SpatialAdapter(channels=2))
+    logger.info(f'Reading {stream}')
+    return stream
+
+def touched_assets() -> dict[str, list[str]]:
+    """
+    Return the names of the assets that have actually been loaded, keyed by
+    registry name.
+    """
+    return {registry.name: registry.touched() for registry in _REGISTRIES}
+
 def highpass_4th_order(stream, frequency):
     # Chain two 2nd order highpass filters together for sharper rolloff
     filtered_stream = pg.BiquadPE(
@@ -27,13 +83,13 @@ def highpass_4th_order(stream, frequency):
         mode=pg.BiquadMode.HIGHPASS)
     return filtered_stream
 
-def load_named_irs() -> dict[str, pg.ProcessingElement]:
+def load_named_irs() -> LazyRegistry:
 
-    named_irs = {}
+    named_irs = _make_registry('irs')
 
     impulse_dir = ASSETS_DIR / "impulses"
     def load_named_ir(name:str, filename:str):
-        named_irs[name] = pg.WavReaderPE(impulse_dir / filename)
+        named_irs.register(name, lambda: pg.WavReaderPE(impulse_dir / filename))
 
 
     load_named_ir("fat_plate", "480_Fat Plate.wav")
@@ -60,30 +116,26 @@ def load_named_irs() -> dict[str, pg.ProcessingElement]:
 
     return named_irs
 
-def load_named_wav_files() -> dict[str, pg.ProcessingElement]:
+def load_named_wav_files(check_remote:bool = False) -> LazyRegistry:
 
     folder_id = '1qX5s1KCxAodHIA2sxxiHgybAHY_52LQn'
-    # oauth_client_secrets may be omitted if stored at the default config path.
-    asset_loader = GoogleDriveAssetLoader(folder_id=folder_id)
-    asset_manager = AssetManager(asset_loader=asset_loader)
+    asset_manager = _lazy_asset_manager(folder_id, check_remote)
+    asset_files = {}
 
-    named_wav_files = {}
+    def prefetch(names:list[str]):
+        # Fetch the .wav files concurrently rather than one at a time
+        prefetch_assets(asset_manager, [asset_files[name] for name in names])
 
-    def load_named_wav_file(name:str, wav_file_name:str):
+    named_wav_files = _make_registry('wav_files', prefetcher=prefetch)
+
+    def open_wav_file(wav_file_name:str):
         # Assure the .wav file is available locally
         path = asset_manager.load_asset(wav_file_name)
+        return _open_stereo_wav(path)
 
-        # Create a WavReaderPE for the .wav file, coerce to stereo
-        stream = pg.WavReaderPE(path=path)
-        if stream.file_sample_rate != SAMPLE_RATE:
-            logger.warn(f'Sample rate of {stream} does not match system sample rate of {SAMPLE_RATE}')
-        else:
-            logger.info(f'Reading {stream}')
-
-        # Coerce to stereo
-        stream = pg.SpatialPE(stream, method=pg.SpatialAdapter(channels=2))
-
-        named_wav_files[name] = stream
+    def load_named_wav_file(name:str, wav_file_name:str):
+        asset_files[name] = wav_file_name
+        named_wav_files.register(name, lambda: open_wav_file(wav_file_name))
 
     load_named_wav_file('rdp_v1', 'GiantFish/wav_sources/shortest_rdp.wav')
     load_named_wav_file('cnrp_v1', 'GiantFish/wav_sources/shortest-cnrp_a.wav')
@@ -111,7 +163,7 @@ def load_named_wav_files() -> dict[str, pg.ProcessingElement]:
 
     return named_wav_files
 
-def post_process_wav_files(named_wav_files:dict[str, pg.ProcessingElement]) -> dict[str, pg.ProcessingElement]:
+def post_process_wav_files(named_wav_files:LazyRegistry) -> LazyRegistry:
     """
     Add gain, compression, etc to wave files 
     """
@@ -122,9 +174,16 @@ def post_process_wav_files(named_wav_files:dict[str, pg.ProcessingElement]) -> d
     return named_wav_files
 
 
-def make_named_slices(named_wav_files:dict[str, pg.ProcessingElement]) -> dict[str, pg.ProcessingElement]:
+def make_named_slices(named_wav_files:LazyRegistry) -> LazyRegistry:
 
-    slices = {}
+    # slice name => names of the .wav files it reads
+    slice_sources = {}
+
+    def prefetch(names:list[str]):
+        wav_names = [wav for name in names for wav in slice_sources[name]]
+        named_wav_files.prefetch(dict.fromkeys(wav_names))
+
+    slices = _make_registry('slices', prefetcher=prefetch)
 
     def s2s(seconds, sample_rate):
         return int(round(seconds * sample_rate))
@@ -154,63 +213,66 @@ def make_named_slices(named_wav_files:dict[str, pg.ProcessingElement]) -> dict[s
         end:Optional[float] = None,
         sample_rate:Optional[int] = None):
         """
-        Extract a slice from the wav_name .wav file and add it to the dict of
-        slice names
+        Register a slice of the wav_name .wav file under slice_name.  The file
+        is only opened when the slice is first used.
         """
-        slices[slice_name] = _make_slice(wav_name, start, end, sample_rate)
-
-    make_slice('r1 my half brother', 'rdp_v1',  0.588796, 3.221062, 48000)
-    make_slice('r1 his house is', 'rdp_v1', 3.278787, 6.742294, 48000)
-    make_slice('r1 most days', 'rdp_v1', 7.157915, 12.918883, 48000)
-    make_slice('r1 tethered only by', 'rdp_v1', 12.965063, 17.952513, 48000)
-    make_slice('r1 at night, far off', 'rdp_v1', 18.552855, 25.826220, 48000)
-    make_slice('r1 once a fish swam', 'rdp_v1', 26.484287, 31.864268, 48000)
-    make_slice('r1 once his breathing', 'rdp_v1', 31.806543, 35.062240, 48000)
-    make_slice('r1 he put something', 'rdp_v1', 35.593311, 38.087036, 48000)
-    make_slice('r1 here, hold this', 'rdp_v1', 38.087036, 40.938657, 48000)
-    make_slice('r1 a while or maybe', 'rdp_v1', 41.700629, 46.018468, 48000)
-    make_slice('r1 we were standing', 'rdp_v1', 46.711170, 51.756345, 48000)
-    make_slice('r1 this is the skull', 'rdp_v1', 51.894886, 54.296251, 48000)
-    make_slice('r1 if you put it up', 'rdp_v1', 54.515606, 57.263322, 48000)
-    make_slice('r1 you can hear', 'rdp_v1', 57.309502, 61.419531, 48000)
-    make_slice('r1 to be born', 'rdp_v1', 61.419531, 64.305787, 48000)
-
-    make_slice('n1 my half brother', 'cnrp_v1', 3.641721, 6.921682, 48000)
-    make_slice('n1 his house is', 'cnrp_v1', 6.921682, 11.118102, 48000)
-    make_slice('n1 most days', 'cnrp_v1', 11.118102, 17.931256, 48000)
-    make_slice('n1 tethered only by', 'cnrp_v1', 17.931256, 22.923549, 48000)
-    slices['n1 at night, far off'] = \
-        pg.SequencePE(
-            (_make_slice('cnrp_v1', 22.911789, 26.599905, 48000), None),
-            (_make_slice('cnrp_v1', 37.689513, 40.821886, 48000), None))
-    make_slice('n1 once a fish swam', 'cnrp_v1', 40.821886, 47.364502, 48000)
-    make_slice('n1 once his breathing', 'cnrp_v1', 47.364502, 51.191554, 48000)
-    make_slice('n1 he put something', 'cnrp_v1', 51.191554, 55.372261, 48000)
-    make_slice('n1 here, hold this', 'cnrp_v1', 55.372261, 58.694091, 48000)
-    make_slice('n1 a while or maybe', 'cnrp_v1', 58.694091, 62.761123, 48000)
-    make_slice('n1 we were standing', 'cnrp_v1', 66.019801, 76.919952, 48000)
-    make_slice('n1 this is the skull', 'cnrp_v1', 76.919952, 79.951280, 48000)
-    make_slice('n1 if you put it up', 'cnrp_v1', 79.951280, 82.780520, 48000)
-    make_slice('n1 you can hear', 'cnrp_v1', 82.780520, 88.476891, 48000)
-    make_slice('n1 to be born', 'cnrp_v1', 88.476891, 91.533480, 48000)
-
-    make_slice('n2 my half brother', 'cnrp_v2', 3.895042, 6.797230, 48000)
-    make_slice('n2 his house is', 'cnrp_v2', 6.797230, 9.966724, 48000)
-    make_slice('n2 most days', 'cnrp_v2', 9.966724, 18.240505, 48000)
-    make_slice('n2 tethered only by', 'cnrp_v2', 18.240505, 23.039299, 48000)
-    make_slice('n2 at night, far off', 'cnrp_v2', 23.039299, 29.556492, 48000)
-    make_slice('n2 once a fish swam', 'cnrp_v2', 29.951088, 34.711695, 48000)
-    make_slice('n2 once his breathing', 'cnrp_v2', 34.711695, 38.441261, 48000)
-    make_slice('n2 he put something', 'cnrp_v2', 38.441261, 43.010934, 48000)
-    make_slice('n2 here, hold this', 'cnrp_v2', 43.010934, 46.218615, 48000)
-    make_slice('n2 a while or maybe', 'cnrp_v2', 46.218615, 49.706332, 48000)
-    make_slice('n2 we were standing', 'cnrp_v2', 51.602937, 59.609412, 48000)
-    make_slice('n2 this is the skull', 'cnrp_v2', 59.609412, 61.798781, 48000)
-    make_slice('n2 if you put it up', 'cnrp_v2', 61.798781, 64.675511, 48000)
-    make_slice('n2 you can hear', 'cnrp_v2', 64.675511, 69.881629, 48000)
-    make_slice('n2 to be born', 'cnrp_v2', 69.881629, 72.794438, 48000)
+        slice_sources[slice_name] = [wav_name]
+        slices.register(
+            slice_name, lambda: _make_slice(wav_name, start, end, sample_rate))
+
+    make_slice('r1 my half brother', 'rdp_v1',  0.588796, 3.221062)
+    make_slice('r1 his house is', 'rdp_v1', 3.278787, 6.742294)
+    make_slice('r1 most days', 'rdp_v1', 7.157915, 12.918883)
+    make_slice('r1 tethered only by', 'rdp_v1', 12.965063, 17.952513)
+    make_slice('r1 at night, far off', 'rdp_v1', 18.552855, 25.826220)
+    make_slice('r1 once a fish swam', 'rdp_v1', 26.484287, 31.864268)
+    make_slice('r1 once his breathing', 'rdp_v1', 31.806543, 35.062240)
+    make_slice('r1 he put something', 'rdp_v1', 35.593311, 38.087036)
+    make_slice('r1 here, hold this', 'rdp_v1', 38.087036, 40.938657)
+    make_slice('r1 a while or maybe', 'rdp_v1', 41.700629, 46.018468)
+    make_slice('r1 we were standing', 'rdp_v1', 46.711170, 51.756345)
+    make_slice('r1 this is the skull', 'rdp_v1', 51.894886, 54.296251)
+    make_slice('r1 if you put it up', 'rdp_v1', 54.515606, 57.263322)
+    make_slice('r1 you can hear', 'rdp_v1', 57.309502, 61.419531)
+    make_slice('r1 to be born', 'rdp_v1', 61.419531, 64.305787)
+
+    make_slice('n1 my half brother', 'cnrp_v1', 3.641721, 6.921682)
+    make_slice('n1 his house is', 'cnrp_v1', 6.921682, 11.118102)
+    make_slice('n1 most days', 'cnrp_v1', 11.118102, 17.931256)
+    make_slice('n1 tethered only by', 'cnrp_v1', 17.931256, 22.923549)
+    slice_sources['n1 at night, far off'] = ['cnrp_v1']
+    slices.register(
+        'n1 at night, far off',
+        lambda: pg.SequencePE(
+            (_make_slice('cnrp_v1', 22.911789, 26.599905), None),
+            (_make_slice('cnrp_v1', 37.689513, 40.821886), None)))
+    make_slice('n1 once a fish swam', 'cnrp_v1', 40.821886, 47.364502)
+    make_slice('n1 once his breathing', 'cnrp_v1', 47.364502, 51.191554)
+    make_slice('n1 he put something', 'cnrp_v1', 51.191554, 55.372261)
+    make_slice('n1 here, hold this', 'cnrp_v1', 55.372261, 58.694091)
+    make_slice('n1 a while or maybe', 'cnrp_v1', 58.694091, 62.761123)
+    make_slice('n1 we were standing', 'cnrp_v1', 66.019801, 76.919952)
+    make_slice('n1 this is the skull', 'cnrp_v1', 76.919952, 79.951280)
+    make_slice('n1 if you put it up', 'cnrp_v1', 79.951280, 82.780520)
+    make_slice('n1 you can hear', 'cnrp_v1', 82.780520, 88.476891)
+    make_slice('n1 to be born', 'cnrp_v1', 88.476891, 91.533480)
+
+    make_slice('n2 my half brother', 'cnrp_v2', 3.895042, 6.797230)
+    make_slice('n2 his house is', 'cnrp_v2', 6.797230, 9.966724)
+    make_slice('n2 most days', 'cnrp_v2', 9.966724, 18.240505)
+    make_slice('n2 tethered only by', 'cnrp_v2', 18.240505, 23.039299)
+    make_slice('n2 at night, far off', 'cnrp_v2', 23.039299, 29.556492)
+    make_slice('n2 once a fish swam', 'cnrp_v2', 29.951088, 34.711695)
+    make_slice('n2 once his breathing', 'cnrp_v2', 34.711695, 38.441261)
+    make_slice('n2 he put something', 'cnrp_v2', 38.441261, 43.010934)
+    make_slice('n2 here, hold this', 'cnrp_v2', 43.010934, 46.218615)
+    make_slice('n2 a while or maybe', 'cnrp_v2', 46.218615, 49.706332)
+    make_slice('n2 we were standing', 'cnrp_v2', 51.602937, 59.609412)
+    make_slice('n2 this is the skull', 'cnrp_v2', 59.609412, 61.798781)
+    make_slice('n2 if you put it up', 'cnrp_v2', 61.798781, 64.675511)
+    make_slice('n2 you can hear', 'cnrp_v2', 64.675511, 69.881629)
+    make_slice('n2 to be born', 'cnrp_v2', 69.881629, 72.794438)
 
-    make_slice('taiko1', 'taiko', 2.42019, 7.51533)
     make_slice('taiko1', 'taiko', 2.42019, 7.51533)
     make_slice('taiko2', 'taiko', 7.45164, 12.8652)
     make_slice('taiko3', 'taiko', 12.8015, 18.1514)
@@ -255,39 +317,35 @@ def make_named_slices(named_wav_files:dict[str, pg.ProcessingElement]) -> dict[s
 def post_process_slices(named_slices):
     return named_slices
 
-def load_uke_notes() -> dict[str, pg.ProcessingElement]:
+def load_uke_notes(check_remote:bool = False) -> LazyRegistry:
     """
-    Load and cache all the single-pluck ukulele sound files from Andy Milburn's
-    library at media/audio/ukes/A/uke_??.wav.  Create a stereo PE stream for
-    each file via SpatialPE(WavReader(f)) and associate it with an asset name.
+    Register all the single-pluck ukulele sound files from Andy Milburn's
+    library at media/audio/ukes/A/uke_??.wav.  Each asset name maps to a
+    stereo PE stream, a memory-mapped MmapWavReaderPE (see
+    _open_stereo_wav()), which is fetched and opened on first use.
     """
 
     folder_id = '1d1h38mZyCZpCHewklJN_PW3uG01K29ON'   # Andy milburn media 
     # folder_id = '1qX5s1KCxAodHIA2sxxiHgybAHY_52LQn' # RDP GiantFish
+    asset_manager = _lazy_asset_manager(folder_id, check_remote)
+    asset_files = {}
 
-    # oauth_client_secrets may be omitted if stored at the default config path.
-    asset_loader = GoogleDriveAssetLoader(folder_id=folder_id)
-    asset_manager = AssetManager(asset_loader=asset_loader)
+    def prefetch(names:list[str]):
+        # Fetch the .wav files concurrently rather than one at a time
+        prefetch_assets(asset_manager, [asset_files[name] for name in names])
 
-    named_wav_files = {}
+    named_wav_files = _make_registry('uke_notes', prefetcher=prefetch)
 
-    def load_named_wav_file(name:str, wav_file_name:str):
+    def open_wav_file(wav_file_name:str):
         # Load the .wav file if not already cached locally
         path = asset_manager.load_asset(wav_file_name)
+        return _open_stereo_wav(path)
 
-        # Create a WavReaderPE for the .wav file, coerce to stereo
-        stream = pg.WavReaderPE(path=path)
-        if stream.file_sample_rate != SAMPLE_RATE:
-            logger.warn(f'Sample rate of {stream} does not match system sample rate of {SAMPLE_RATE}')
-        else:
-            logger.info(f'Reading {stream}')
-
-        # Coerce to stereo
-        stream = pg.SpatialPE(stream, method=pg.SpatialAdapter(channels=2))
-
-        named_wav_files[name] = stream
+    def load_named_wav_file(name:str, wav_file_name:str):
+        asset_files[name] = wav_file_name
+        named_wav_files.register(name, lambda: open_wav_file(wav_file_name))
 
-    # load up all the uke files
+    # register all the uke files
     for i in range(21, 96):
         load_named_wav_file(f'uke_{i:02d}', f'media/audio/ukes/A/{i:02d}.wav')
     return named_wav_files
@@ -298,14 +356,14 @@ def load_uke_notes() -> dict[str, pg.ProcessingElement]:
 def get_named_irs():
     return load_named_irs()
 
-def get_wav_files():
-    return post_process_wav_files(load_named_wav_files())
+def get_wav_files(check_remote:bool = False):
+    return post_process_wav_files(load_named_wav_files(check_remote))
 
-def get_named_slices():
-    return post_process_slices(make_named_slices(get_wav_files()))
+def get_named_slices(check_remote:bool = False):
+    return post_process_slices(make_named_slices(get_wav_files(check_remote)))
 
-def get_uke_notes():
-    return load_uke_notes()
+def get_uke_notes(check_remote:bool = False):
+    return load_uke_notes(check_remote)
 
 # --------------------------------------------------------------------------
 # --------------------------------------------------------------------------
@@ -315,17 +373,11 @@ if __name__ == "__main__":
 
     SAMPLE_RATE = 44100
 
-    def _play(source, sample_rate):
-        renderer = pg.AudioRenderer(sample_rate=sample_rate)
-        renderer.set_source(source)
-        with renderer:
-            renderer.start()
-            renderer.play_extent()
-
     def _audition_named_assets(asset_dict):
         """
         asset_dict: dict[str, ProcessingElement]
-        Uses _play(pe) to audition the selected PE.
+        Uses preview(pe) to audition the selected PE, rendering ahead on a
+        worker thread so long reverbs and compressors don't underrun.
         """
         names = list(asset_dict.keys())
 
@@ -350,14 +402,14 @@ if __name__ == "__main__":
                 idx = int(choice)
                 if 1 <= idx <= len(names):
                     name = names[idx - 1]
-                    _play(asset_dict[name], SAMPLE_RATE)
+                    preview(asset_dict[name], SAMPLE_RATE)
                 else:
                     print("Invalid number.")
                 continue
 
             # name choice
             if choice in asset_dict:
-                _play(asset_dict[choice], SAMPLE_RATE)
+                preview(asset_dict[choice], SAMPLE_RATE)
             else:
                 print("Unknown name. Enter '?' for list.")
 
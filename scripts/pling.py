@@ -1,5 +1,5 @@
 import pygmu2 as pg
-from pygmu2.karplus_strong_pe import rho_for_decay_db
+from giantfish.string_bank import KarplusStrongBankPE
 import random
 
 SAMPLE_RATE = 44100
@@ -42,26 +42,30 @@ def make_good_pitches():
             print() 
             return n0, n1, n2, n3
 
-def make_kp(pitch, seconds):
-    freq = pg.pitch_to_freq(pitch)
-    rho = rho_for_decay_db(
-        seconds = seconds,
-        frequency = freq,
-        sample_rate = SAMPLE_RATE,
-        db = -60)
-    return pg.KarplusStrongPE(
-        frequency = freq,
-        rho = rho,
-        amplitude = 1.0)
+# When each string of a stack is plucked, in seconds
+STRUM_TIMES = [0, 0.6, 0.9, 1.0]
+
+def make_string_bank(stacks, spacing=0.0):
+    """
+    One bank of plucked strings for all `stacks`, each stack starting
+    `spacing` seconds after the previous one.  Every string is rendered by the
+    same PE, so a whole progression costs about as much as a single stack.
+    """
+    pitches = []
+    onsets = []
+    for i, stack in enumerate(stacks):
+        for pitch, strum_time in zip(stack, STRUM_TIMES):
+            pitches.append(pitch)
+            onsets.append(s2s(i * spacing + strum_time))
+    return KarplusStrongBankPE(
+        frequencies=[pg.pitch_to_freq(pitch) for pitch in pitches],
+        onsets=onsets,
+        decay_seconds=2.0,
+        amplitude=1.0)
 
 
 def make_instrument_stack(stack):
-    plucks = pg.SequencePE([
-        (make_kp(stack[0], 2.0), s2s(0)),
-        (make_kp(stack[1], 2.0), s2s(0.6)),
-        (make_kp(stack[2], 2.0), s2s(0.9)),
-        (make_kp(stack[3], 2.0), s2s(1.0))]
-    )
+    plucks = make_string_bank([stack])
     # coerce to stereo
     plucks = pg.SpatialPE(plucks, method=pg.SpatialAdapter(channels=2))
     wet_plucks = pg.ReverbPE(plucks, IR, mix=0.6)
@@ -1,5 +1,8 @@
+import argparse
 import pygmu2 as pg
 from pygmu2.asset_manager import AssetManager, GoogleDriveAssetLoader
+from giantfish.manifest import ManifestAssetManager, drive_files
+from giantfish.preprocess import Step, run_pipeline
 
 SAMPLE_RATE = 44100
 pg.set_sample_rate(SAMPLE_RATE)
@@ -15,115 +18,64 @@ call TimeWarp or CompressPE with lookahead with an "upstream" filter.  The most
 general thing to do is to pre-process the .wav file and write the result to a 
 new file.
 
-In our case, we act on files in the AssetManager cache.
+In our case, we act on files in the AssetManager cache.  Each step below names
+its input asset, an operation (see giantfish.preprocess.OPERATIONS) with its
+parameters, and the output asset.  Running this script rebuilds only the
+outputs whose input or parameters changed, running independent steps in
+parallel.
 """
 
-ASSET_NAME = 'GiantFish/wav_sources/Hummy Bubbles.wav'
-PROCESSED_NAME = 'GiantFish/wav_sources/Bubbles.wav'
-
-def highpass_4th_order(stream, frequency):
-    # Chain two 2nd order highpass filters together for sharper rolloff
-    filtered_stream = pg.BiquadPE(
-        stream, 
-        frequency=frequency, 
-        q=0.707, 
-        mode=pg.BiquadMode.HIGHPASS)
-    filtered_stream = pg.BiquadPE(
-        filtered_stream, 
-        frequency=frequency, 
-        q=0.707, 
-        mode=pg.BiquadMode.HIGHPASS)
-    return filtered_stream
-
-def write_stream_to_wav_file(stream, path):
-    extent = stream.extent()
-    writer = pg.WavWriterPE(stream, path, sample_rate=SAMPLE_RATE)
-    renderer = pg.NullRenderer(sample_rate=SAMPLE_RATE)
-    renderer.set_source(writer)
-
-    with renderer:
-        renderer.start()
-        renderer.render(extent.start, extent.end - extent.start)
-    logger.info(f"Wrote {path}")
-
-def highpass_file(unprocessed_name, processed_name, freq):
-    gdrive_folder_id = '1qX5s1KCxAodHIA2sxxiHgybAHY_52LQn'
-    # oauth_client_secrets may be omitted if stored at the default config path.
-    asset_loader = GoogleDriveAssetLoader(folder_id=gdrive_folder_id)
-    asset_manager = AssetManager(asset_loader=asset_loader)
-    cache_dir = asset_manager.cache_path()
-
-    # load .wav file into cache from google drive if needed, return path...
-    unprocessed_path = asset_manager.load_asset(unprocessed_name)
-
-    # convert to a pygmu2 stream
-    stream = pg.WavReaderPE(path=unprocessed_path)
-
-    logger.info(f'Reading {stream}')
-    if stream.file_sample_rate != SAMPLE_RATE:
-        logger.warn(f'sample rate mismatch: file={stream.file_sample_rate}, system={SAMPLE_RATE}, ignoring...')
-
-    # process file and write to cache directory...
-    processed_stream = highpass_4th_order(stream, freq)
-
-    write_stream_to_wav_file(processed_stream, cache_dir / processed_name)
-
-def pitch_file(unprocessed_name, processed_name, rate):
-    gdrive_folder_id = '1qX5s1KCxAodHIA2sxxiHgybAHY_52LQn'
+GDRIVE_FOLDER_ID = '1qX5s1KCxAodHIA2sxxiHgybAHY_52LQn'
+
+STEPS = [
+    Step('GiantFish/wav_sources/Hummy Bubbles.wav', 'highpass',
+         'GiantFish/wav_sources/Bubbles.wav', {'frequency': 1000}),
+    Step('GiantFish/wav_sources/Valparaiso St 5.wav', 'highpass',
+         'GiantFish/wav_sources/Foghorns.wav', {'frequency': 100}),
+    Step('GiantFish/wav_sources/Bubbles.wav', 'pitch',
+         'GiantFish/wav_sources/Bubbles_0_125.wav', {'rate': 0.125}),
+    Step('GiantFish/wav_sources/jasper_1.wav', 'pitch',
+         'GiantFish/wav_sources/jasper1_0_3.wav', {'rate': 0.3}),
+    Step('GiantFish/wav_sources/jasper_2.wav', 'pitch',
+         'GiantFish/wav_sources/jasper2_0_3.wav', {'rate': 0.3}),
+    Step('GiantFish/wav_sources/jasper_3.wav', 'pitch',
+         'GiantFish/wav_sources/jasper3_0_3.wav', {'rate': 0.3}),
+    Step('GiantFish/wav_sources/jasper_4.wav', 'pitch',
+         'GiantFish/wav_sources/jasper4_0_3.wav', {'rate': 0.3}),
+    Step('GiantFish/wav_sources/jasper_5.wav', 'pitch',
+         'GiantFish/wav_sources/jasper5_0_3.wav', {'rate': 0.3}),
+    Step('GiantFish/wav_sources/jasper_6.wav', 'pitch',
+         'GiantFish/wav_sources/jasper6_0_3.wav', {'rate': 0.3}),
+]
+
+def make_asset_manager():
     # oauth_client_secrets may be omitted if stored at the default config path.
-    asset_loader = GoogleDriveAssetLoader(folder_id=gdrive_folder_id)
-    asset_manager = AssetManager(asset_loader=asset_loader)
-    cache_dir = asset_manager.cache_path()
-
-    # load .wav file into cache from google drive if needed, return path...
-    unprocessed_path = asset_manager.load_asset(unprocessed_name)
-
-    # convert to a pygmu2 stream
-    stream = pg.WavReaderPE(path=unprocessed_path)
-
-    logger.info(f'Reading {stream}')
-    if stream.file_sample_rate != SAMPLE_RATE:
-        logger.warn(f'sample rate mismatch: file={stream.file_sample_rate}, system={SAMPLE_RATE}, ignoring...')
-
-    # process file and write to cache directory...
-    processed_stream = pg.TimeWarpPE(stream, rate)
-
-    write_stream_to_wav_file(processed_stream, cache_dir / processed_name)
-
-
-# highpass_file(
-#     'GiantFish/wav_sources/Hummy Bubbles.wav',
-#     'GiantFish/wav_sources/Bubbles.wav',
-#     1000)
-# highpass_file(
-#     'GiantFish/wav_sources/Valparaiso St 5.wav',
-#     'GiantFish/wav_sources/Foghorns.wav',
-#     100)
-# pitch_file(
-#     'GiantFish/wav_sources/Bubbles.wav',
-#     'GiantFish/wav_sources/Bubbles_0_125.wav',
-#     0.125)
-# pitch_file(
-#     'GiantFish/wav_sources/jasper_1.wav',
-#     'GiantFish/wav_sources/jasper1_0_3.wav',
-#     0.3)
-# pitch_file(
-#     'GiantFish/wav_sources/jasper_2.wav',
-#     'GiantFish/wav_sources/jasper2_0_3.wav',
-#     0.3)
-# pitch_file(
-#     'GiantFish/wav_sources/jasper_3.wav',
-#     'GiantFish/wav_sources/jasper3_0_3.wav',
-#     0.3)
-# pitch_file(
-#     'GiantFish/wav_sources/jasper_4.wav',
-#     'GiantFish/wav_sources/jasper4_0_3.wav',
-#     0.3)
-# pitch_file(
-#     'GiantFish/wav_sources/jasper_5.wav',
-#     'GiantFish/wav_sources/jasper5_0_3.wav',
-#     0.3)
-# pitch_file(
-#     'GiantFish/wav_sources/jasper_6.wav',
-#     'GiantFish/wav_sources/jasper6_0_3.wav',
-#     0.3)
+    asset_loader = GoogleDriveAssetLoader(folder_id=GDRIVE_FOLDER_ID)
+    return AssetManager(asset_loader=asset_loader)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild stale derived assets")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of steps to run in parallel (default: one per CPU)")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild every output even if it is up to date")
+    parser.add_argument(
+        "--check-drive",
+        action="store_true",
+        help="Fetch inputs again if they have changed on Google Drive since "
+             "they were cached")
+    args = parser.parse_args()
+
+    asset_manager = ManifestAssetManager(
+        GDRIVE_FOLDER_ID,
+        make_asset_manager,
+        remote_files=drive_files(GDRIVE_FOLDER_ID),
+        check_remote=args.check_drive)
+    ran = run_pipeline(
+        STEPS, asset_manager, SAMPLE_RATE, jobs=args.jobs, force=args.force)
+    logger.info(f"Rebuilt {len(ran)} of {len(STEPS)} derived assets")
@@ -4,6 +4,7 @@ import pygmu2 as pg
 pg.set_sample_rate(44100)
 from pygmu2.logger import get_logger
 from pygmu2.asset_manager import AssetManager, GoogleDriveAssetLoader
+from giantfish.prefetch import PerThreadAssetManager, prefetch_assets
 
 logger = get_logger(__name__)
 logger = logger if logger.handlers else None
@@ -11,20 +12,29 @@ logger = logger if logger.handlers else None
 
 def cache_voice_segments():
     folder_id = "1qX5s1KCxAodHIA2sxxiHgybAHY_52LQn"
-    # oauth_client_secrets may be omitted if stored at the default config path.
-    asset_loader = GoogleDriveAssetLoader(
-        folder_id=folder_id,
-    )
-    asset_manager = AssetManager(asset_loader=asset_loader)
+
+    def make_asset_manager():
+        # oauth_client_secrets may be omitted if stored at the default config path.
+        asset_loader = GoogleDriveAssetLoader(
+            folder_id=folder_id,
+        )
+        return AssetManager(asset_loader=asset_loader)
+
+    # One AssetManager per prefetch thread; they aren't thread-safe
+    asset_manager = PerThreadAssetManager(make_asset_manager)
 
     # List all remote assets that match wildcard spec
     asset_spec = "GiantFish/SegmentedVoice/*_??.wav"
     remote_assets = asset_manager.list_remote_assets(asset_spec)
     print(f"Found {len(remote_assets)} remote assets")
-    for asset in remote_assets:
-        print(f"  - remote: {asset}")
-        path = asset_manager.load_asset(str(asset))
-        print(f"  - loaded: {path}")
+
+    def progress(completed, total, name):
+        print(f"  - loaded ({completed}/{total}): {name}")
+
+    prefetch_assets(
+        asset_manager,
+        [str(asset) for asset in remote_assets],
+        progress=progress)
 
 def ingest_voice_segment(filename):
     # read wavfile and compress.
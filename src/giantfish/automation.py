@@ -0,0 +1,175 @@
+"""Breakpoint gain automation in dB, evaluated per segment or at control rate."""
+from __future__ import annotations
+
+import math
+from typing import Optional, Sequence
+
+import numpy as np
+import pygmu2 as pg
+
+_LN10_OVER_20 = math.log(10.0) / 20.0
+
+
+class DbCurve:
+    """
+    A piecewise-linear curve in dB, read out as linear gain.
+
+    `breakpoints` are (time, dB) pairs; times are in samples, or in beats if
+    `samples_per_beat` is given.  The curve holds its first value before the
+    first breakpoint and its last value after the last one.
+
+    With `control_period` None the gain is exact: flat segments become a
+    single scalar and each ramp is evaluated in closed form as an
+    exponential.  With a `control_period` (in samples) the curve is only
+    evaluated every `control_period` samples, on a grid fixed in absolute
+    time, and the linear gain is interpolated between those points.
+    """
+
+    def __init__(
+        self,
+        breakpoints: Sequence[tuple[float, float]],
+        samples_per_beat: Optional[float] = None,
+        control_period: Optional[int] = None,
+    ):
+        if not breakpoints:
+            raise ValueError("DbCurve needs at least one breakpoint")
+        times = [t if samples_per_beat is None else t * samples_per_beat
+                 for t, _ in breakpoints]
+        self.times = np.rint(np.asarray(times, dtype=np.float64)).astype(np.int64)
+        if np.any(np.diff(self.times) < 0):
+            raise ValueError("breakpoint times must not decrease")
+        self.dbs = np.asarray([db for _, db in breakpoints], dtype=np.float64)
+        if control_period is not None and control_period < 1:
+            raise ValueError("control_period must be at least 1 sample")
+        self.control_period = control_period
+
+    def db_at(self, time: float) -> float:
+        return float(np.interp(time, self.times, self.dbs))
+
+    def gains(self, start: int, duration: int) -> float | np.ndarray:
+        """
+        Linear gain over [start, start + duration): a float if it is constant
+        over the whole window, else a float32 array of `duration` values.
+        """
+        end = start + duration
+        # Breakpoints strictly inside the window split it into pieces.
+        lo = np.searchsorted(self.times, start, side="right")
+        hi = np.searchsorted(self.times, end, side="left")
+        edges = [start, *self.times[lo:hi].tolist(), end]
+        levels = [self.db_at(t) for t in edges]
+        if len(edges) == 2 and levels[0] == self.db_at(end - 1):
+            return 10.0 ** (levels[0] / 20.0)
+        if self.control_period is not None:
+            return self._control_rate_gains(start, duration)
+
+        out = np.empty(duration, dtype=np.float32)
+        for a, b, db_a, db_b in zip(edges, edges[1:], levels, levels[1:]):
+            if a == b:
+                continue
+            if db_a == db_b:
+                out[a - start:b - start] = 10.0 ** (db_a / 20.0)
+            else:
+                slope = (db_b - db_a) / (b - a)
+                ramp = np.arange(b - a, dtype=np.float64) * (slope * _LN10_OVER_20)
+                out[a - start:b - start] = 10.0 ** (db_a / 20.0) * np.exp(ramp)
+        return out
+
+    def _control_rate_gains(self, start: int, duration: int) -> np.ndarray:
+        period = self.control_period
+        first = (start // period) * period
+        last = -(-(start + duration) // period) * period
+        points = np.arange(first, last + 1, period)
+        point_gains = 10.0 ** (np.interp(points, self.times, self.dbs) / 20.0)
+        samples = np.arange(start, start + duration)
+        return np.interp(samples, points, point_gains).astype(np.float32)
+
+
+class DbAutomationPE(pg.SourcePE):
+    """
+    A mono control signal carrying the linear gain of a DbCurve, for use
+    wherever a gain PE is expected.  Prefer AutomatedGainPE when the gain is
+    only used to scale one source.
+    """
+
+    def __init__(
+        self,
+        breakpoints: Sequence[tuple[float, float]],
+        samples_per_beat: Optional[float] = None,
+        control_period: Optional[int] = None,
+    ):
+        super().__init__()
+        self._curve = DbCurve(breakpoints, samples_per_beat, control_period)
+
+    @property
+    def curve(self) -> DbCurve:
+        return self._curve
+
+    def _compute_extent(self) -> pg.Extent:
+        return pg.Extent(None, None)
+
+    def channel_count(self) -> int:
+        return 1
+
+    def is_pure(self) -> bool:
+        return True
+
+    def _render(self, start: int, duration: int) -> pg.Snippet:
+        gains = self._curve.gains(start, duration)
+        out = np.empty((duration, 1), dtype=np.float32)
+        out[:, 0] = gains
+        return pg.Snippet(start, out)
+
+
+class AutomatedGainPE(pg.ProcessingElement):
+    """
+    `src` scaled by a dB breakpoint curve: the fused equivalent of
+
+        GainPE(src, gain=TransformPE(PiecewisePE(breakpoints), func=db_to_ratio))
+
+    without rendering a control signal or converting dB per sample.  Blocks
+    inside a flat segment cost one scalar multiply (none at 0 dB); see
+    DbCurve for how ramps are evaluated.
+    """
+
+    def __init__(
+        self,
+        src: pg.ProcessingElement,
+        breakpoints: Sequence[tuple[float, float]],
+        samples_per_beat: Optional[float] = None,
+        control_period: Optional[int] = None,
+    ):
+        super().__init__()
+        self._src = src
+        self._curve = DbCurve(breakpoints, samples_per_beat, control_period)
+
+    @property
+    def src(self) -> pg.ProcessingElement:
+        return self._src
+
+    @property
+    def curve(self) -> DbCurve:
+        return self._curve
+
+    def inputs(self) -> list[pg.ProcessingElement]:
+        return [self._src]
+
+    def is_pure(self) -> bool:
+        return self._src.is_pure()
+
+    def preroll_samples(self) -> int:
+        return 0
+
+    def channel_count(self) -> Optional[int]:
+        return self._src.channel_count()
+
+    def _compute_extent(self) -> pg.Extent:
+        return self._src.extent()
+
+    def _render(self, start: int, duration: int) -> pg.Snippet:
+        snippet = self._src.render(start, duration)
+        gains = self._curve.gains(start, duration)
+        if isinstance(gains, float):
+            if gains == 1.0:
+                return snippet
+            return pg.Snippet(start, (snippet.data * np.float32(gains)).astype(np.float32))
+        return pg.Snippet(start, snippet.data * gains[:, np.newaxis])
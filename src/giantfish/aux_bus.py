@@ -0,0 +1,85 @@
+"""Shared reverb send/return buses."""
+from __future__ import annotations
+
+from typing import Optional
+
+import pygmu2 as pg
+
+from giantfish.convolution_pe import DEFAULT_PARTITION_SIZE, PartitionedConvolutionPE
+from giantfish.graph_optimize import SharedPE
+from giantfish.sparse_mix import SparseMixPE
+
+
+class ReverbBus:
+    """
+    A convolution reverb shared by several tracks.
+
+    Each `send()` splits a track into a dry path, scaled by (1 - level), and a
+    send, scaled by `level`.  The bus convolves the sum of all sends once, so
+    N tracks on the same room cost one convolution instead of N.  Because
+    convolution is linear, a track sent at `level` sounds the same as
+    ReverbPE(track, ir, mix=level).
+    """
+
+    def __init__(
+        self,
+        ir: pg.ProcessingElement,
+        partition_size: int = DEFAULT_PARTITION_SIZE,
+    ):
+        self._ir = ir
+        self._partition_size = partition_size
+        self._sends: list[pg.ProcessingElement] = []
+        self._return: Optional[pg.ProcessingElement] = None
+
+    @property
+    def ir(self) -> pg.ProcessingElement:
+        return self._ir
+
+    def send(self, src: pg.ProcessingElement, level: float) -> pg.ProcessingElement:
+        """Send `src` to this bus at `level` and return its dry path."""
+        if self._return is not None:
+            raise RuntimeError("cannot add a send after the bus return was built")
+        # The bus reads its sends a partition at a time, up to a partition
+        # ahead of the dry path; the tap keeps that much behind its newest
+        # sample so both are served from one contiguous pass over `src`.
+        tap = SharedPE(src, history=self._partition_size)
+        self._sends.append(pg.GainPE(tap, level))
+        return pg.GainPE(tap, 1.0 - level)
+
+    def return_pe(self) -> pg.ProcessingElement:
+        """Return the wet output of the bus: the convolved sum of all sends."""
+        if self._return is None:
+            if not self._sends:
+                raise RuntimeError("bus has no sends")
+            sends = self._sends[0] if len(self._sends) == 1 else SparseMixPE(*self._sends)
+            self._return = PartitionedConvolutionPE(
+                sends, self._ir, mix=1.0, partition_size=self._partition_size)
+        return self._return
+
+
+class AuxBuses:
+    """A set of named reverb buses."""
+
+    def __init__(self):
+        self._buses: dict[str, ReverbBus] = {}
+
+    def add(self, name: str, ir: pg.ProcessingElement, **kwargs) -> ReverbBus:
+        if name in self._buses:
+            raise KeyError(f"bus '{name}' already exists")
+        bus = self._buses[name] = ReverbBus(ir, **kwargs)
+        return bus
+
+    def __getitem__(self, name: str) -> ReverbBus:
+        return self._buses[name]
+
+    def send(
+        self,
+        name: str,
+        src: pg.ProcessingElement,
+        level: float,
+    ) -> pg.ProcessingElement:
+        """Send `src` to the bus called `name` and return its dry path."""
+        return self._buses[name].send(src, level)
+
+    def returns(self) -> dict[str, pg.ProcessingElement]:
+        return {name: bus.return_pe() for name, bus in self._buses.items()}
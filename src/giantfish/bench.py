@@ -0,0 +1,367 @@
+"""Render benchmarks for the project's graphs, with baseline comparison."""
+from __future__ import annotations
+
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+import numpy as np
+import pygmu2 as pg
+from pygmu2.logger import get_logger
+
+from giantfish.buffer_pe import BufferPE
+from giantfish.config import ASSETS_DIR, CACHE_DIR
+from giantfish.graph_optimize import optimize_graph
+from giantfish.preprocess import highpass_4th_order
+from giantfish.render import render_to_array
+from giantfish.score_graph import (
+    PLING_STACKS, SCORE_BEATS, SEED, beats_to_samples, build_score, generate_stacked_chords)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = get_logger(__name__)
+
+BENCH_DIR = CACHE_DIR / "bench"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+RESULTS_PATH = BENCH_DIR / "latest.json"
+
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_BLOCK_SIZE = 1024
+# Fractional drop in real-time factor (or growth in peak RSS) that counts
+# as a regression.
+DEFAULT_TOLERANCE = 0.10
+
+_SEED = 20260210
+
+# Lengths of the stand-ins for the score's slices, roughly as recorded
+_SLICE_SECONDS = {"bubbles_0_125": 24.0, "foghorns": 20.0, "snores": 12.0, "crowd": 20.0}
+_IR_FILES = {
+    "synthetic_ir_10": "synthetic_ir_10.wav",
+    "small_prehistoric_cave": "Small Prehistoric Cave.wav",
+    "small_plate": "480_Small Plate.wav",
+}
+_IR_SECONDS = {"synthetic_ir_10": 10.0}
+
+
+class StandIns:
+    """
+    Assets for the benchmark graphs (see score_graph.ScoreAssets).  IRs are
+    read from ASSETS_DIR/impulses when present and synthesised otherwise;
+    Drive slices and uke notes are always synthetic, seeded by name, so the
+    graphs are built from the same audio on every run without network
+    access.  The score's pan walk and drum choices come from pygmu2's
+    unseeded RandomPE and RandomSelectPE, so the rendered audio still varies
+    between runs, though the work done doesn't.  `synthetic` lists the
+    stand-ins used.  Subgraphs the score freezes are bounced into
+    `freeze_root`.
+    """
+
+    def __init__(self, sample_rate: int, freeze_root: Optional[Path] = None):
+        self.sample_rate = sample_rate
+        self.freeze_root = freeze_root
+        self.synthetic: set[str] = set()
+
+    def samples(self, seconds: float) -> int:
+        return int(round(seconds * self.sample_rate))
+
+    def beats(self, beats: float) -> int:
+        return beats_to_samples(beats, self.sample_rate)
+
+    def _rng(self, name: str) -> np.random.Generator:
+        return np.random.default_rng([_SEED, zlib.crc32(name.encode())])
+
+    def ir(self, name: str, seconds: Optional[float] = None) -> pg.ProcessingElement:
+        path = ASSETS_DIR / "impulses" / _IR_FILES.get(name, f"{name}.wav")
+        if path.exists():
+            return pg.WavReaderPE(str(path))
+        self.synthetic.add(name)
+        # Exponentially decaying stereo noise, -60 dB at `seconds`
+        n = self.samples(seconds if seconds is not None else _IR_SECONDS.get(name, 2.0))
+        envelope = np.exp(np.linspace(0.0, -6.9, n, dtype=np.float32))
+        noise = self._rng(name).standard_normal((n, 2)).astype(np.float32)
+        return BufferPE(0.1 * noise * envelope[:, np.newaxis])
+
+    def slice(self, name: str, seconds: Optional[float] = None) -> pg.ProcessingElement:
+        """Stereo band-limited noise with a slow amplitude swell, like a field recording."""
+        self.synthetic.add(name)
+        n = self.samples(seconds if seconds is not None else _slice_seconds(name))
+        rng = self._rng(name)
+        noise = rng.standard_normal((n, 2)).astype(np.float32)
+        noise = (noise + np.roll(noise, 1, axis=0)) * 0.5
+        swell = 0.5 - 0.5 * np.cos(np.linspace(0.0, 2.0 * np.pi, n, dtype=np.float32))
+        return BufferPE(0.2 * noise * swell[:, np.newaxis])
+
+    def uke_note(self, name: str, seconds: float = 3.0) -> pg.ProcessingElement:
+        """A decaying plucked tone at the MIDI pitch in `name` ("uke_NN")."""
+        self.synthetic.add(name)
+        t = np.arange(self.samples(seconds), dtype=np.float32) / self.sample_rate
+        frequency = 440.0 * 2.0 ** ((int(name[4:]) - 69) / 12.0)
+        tone = np.sin(2.0 * np.pi * frequency * t) * np.exp(-3.0 * t)
+        return BufferPE(np.repeat((0.3 * tone)[:, np.newaxis], 2, axis=1).astype(np.float32))
+
+
+def _slice_seconds(name: str) -> float:
+    if name in _SLICE_SECONDS:
+        return _SLICE_SECONDS[name]
+    if name.startswith("jasper"):
+        return 14.0 + 2.0 * int(name[6])
+    if name.startswith("taiko"):
+        return 1.5
+    # A spoken phrase
+    return 2.0 + (zlib.crc32(name.encode()) % 4) * 0.5
+
+
+def _score_tracks(assets: StandIns) -> dict[str, pg.ProcessingElement]:
+    """The tracks of score.py, built and optimized as it does, from stand-ins."""
+    score = build_score(assets, assets.sample_rate, freeze_root=assets.freeze_root)
+    tracks, _ = optimize_graph(score.tracks)
+    return tracks
+
+
+def _score_mix(assets: StandIns) -> tuple[pg.ProcessingElement, int]:
+    return pg.MixPE(*_score_tracks(assets).values()), assets.beats(SCORE_BEATS)
+
+
+def _score_track(name: str) -> Callable[[StandIns], tuple[pg.ProcessingElement, int]]:
+    def build(assets: StandIns) -> tuple[pg.ProcessingElement, int]:
+        return _score_tracks(assets)[name], assets.beats(SCORE_BEATS)
+    return build
+
+
+def _karplus_reverb(assets: StandIns) -> tuple[pg.ProcessingElement, int]:
+    # As scripts/demo_karplus_reverb.py
+    from pygmu2.karplus_strong_pe import rho_for_decay_db
+
+    frequency = 220.0
+    rho = rho_for_decay_db(
+        seconds=2.0, frequency=frequency, sample_rate=assets.sample_rate, db=-60.0)
+    pluck = pg.KarplusStrongPE(frequency=frequency, rho=rho, amplitude=0.8)
+    pluck = pg.CropPE(pluck, 0, assets.samples(2.0))
+    pluck = pg.SpatialPE(pluck, method=pg.SpatialAdapter(channels=2))
+    reverb = pg.ReverbPE(pluck, assets.ir("synthetic_ir_10"), mix=0.5)
+    return reverb, assets.samples(12.0)
+
+
+def _uke_chord_bank(assets: StandIns) -> tuple[pg.ProcessingElement, int]:
+    chords = generate_stacked_chords(
+        assets, PLING_STACKS, assets.sample_rate, rng=random.Random(SEED))
+    return chords, assets.beats(len(PLING_STACKS) * 14)
+
+
+def _highpass_preprocess(assets: StandIns) -> tuple[pg.ProcessingElement, int]:
+    # As the "highpass" step of scripts/preprocess_file.py
+    src = assets.slice("Hummy Bubbles", 60.0)
+    return highpass_4th_order(src, 1000), src.extent().duration
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    description: str
+    build: Callable[[StandIns], tuple[pg.ProcessingElement, int]]
+
+
+def _scenarios() -> dict[str, Scenario]:
+    scenarios = [
+        Scenario("score_mix", "score.py, all tracks mixed", _score_mix),
+        *(Scenario(f"track:{name}", f"score.py '{name}' track alone", _score_track(name))
+          for name in ("bubbles", "foghorn", "snores", "whalesong+plings",
+                       "drums", "voices", "crowd")),
+        Scenario("karplus_reverb", "demo_karplus_reverb.py", _karplus_reverb),
+        Scenario("uke_chords", "score.py's uke chord stacks on a SamplerPE", _uke_chord_bank),
+        Scenario("highpass_preprocess", "highpass_4th_order over 60 s", _highpass_preprocess),
+    ]
+    return {scenario.name: scenario for scenario in scenarios}
+
+
+SCENARIOS = _scenarios()
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+
+def run_scenario(
+    name: str,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_seconds: Optional[float] = None,
+) -> dict[str, Any]:
+    """
+    Build scenario `name` and render it block by block from sample 0,
+    returning its timings.  Building is timed separately: it includes the
+    work the score does up front (looping slices into memory, freezing the
+    voices and crowd, rendering uke samples).  Frozen subgraphs go to a
+    temporary directory, so every run bounces them afresh.  Peak RSS covers
+    the whole process, so run each scenario in a fresh process (as
+    run_suite() does) to attribute it.
+    """
+    pg.set_sample_rate(sample_rate)
+    with tempfile.TemporaryDirectory(prefix="giantfish-bench-") as freeze_root:
+        assets = StandIns(sample_rate, freeze_root=Path(freeze_root))
+        t0 = time.perf_counter()
+        graph, duration = SCENARIOS[name].build(assets)
+        build = time.perf_counter() - t0
+        if max_seconds is not None:
+            duration = min(duration, int(max_seconds * sample_rate))
+
+        latencies = []
+        renderer = pg.NullRenderer(sample_rate=sample_rate)
+        renderer.set_source(graph)
+        t0 = time.perf_counter()
+        with renderer:
+            renderer.start()
+            for pos in range(0, duration, block_size):
+                b0 = time.perf_counter()
+                graph.render(pos, min(block_size, duration - pos))
+                latencies.append(time.perf_counter() - b0)
+        wall = time.perf_counter() - t0
+
+    audio_seconds = duration / sample_rate
+    latencies_ms = np.asarray(latencies) * 1000.0
+    return {
+        "audio_seconds": audio_seconds,
+        "build_seconds": build,
+        "wall_seconds": wall,
+        "realtime_factor": audio_seconds / wall if wall > 0 else math.inf,
+        "peak_rss_mb": _peak_rss_mb(),
+        "block_ms": {
+            "p50": float(np.percentile(latencies_ms, 50)),
+            "p90": float(np.percentile(latencies_ms, 90)),
+            "p99": float(np.percentile(latencies_ms, 99)),
+            "max": float(latencies_ms.max()),
+        },
+        "synthetic_assets": sorted(assets.synthetic),
+    }
+
+
+def time_render(
+    label: str,
+    pe: pg.ProcessingElement,
+    duration: int,
+    sample_rate: int,
+    label_width: int = 32,
+) -> np.ndarray:
+    """
+    Render [0, duration) of `pe` in one go, print how long that took against
+    real time, and return the samples.  For one-off comparisons of two ways
+    of rendering the same thing, such as scripts/bench_reverb.py.
+    """
+    t0 = time.perf_counter()
+    out = render_to_array(pe, 0, duration, sample_rate)
+    elapsed = time.perf_counter() - t0
+    rtf = (duration / sample_rate) / elapsed if elapsed > 0 else math.inf
+    print(f"{label:>{label_width}s}: {elapsed:8.3f} s  ({rtf:7.2f}x real time)")
+    return out
+
+
+def run_suite(
+    names: Optional[Iterable[str]] = None,
+    sample_rate: int = DEFAULT_SAMPLE_RATE,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_seconds: Optional[float] = None,
+) -> dict[str, Any]:
+    """
+    Run each named scenario (default: all of them) in its own spawned
+    process and return the results, ready to save with save_results().
+    """
+    names = list(SCENARIOS if names is None else names)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise KeyError(f"unknown scenario(s): {', '.join(unknown)}")
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for name in names:
+        logger.info(f"Running benchmark '{name}'")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[name] = pool.submit(
+                run_scenario, name, sample_rate, block_size, max_seconds).result()
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "sample_rate": sample_rate,
+        "block_size": block_size,
+        "scenarios": results,
+    }
+
+
+def save_results(results: dict[str, Any], path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(results, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_results(path: Path) -> Optional[dict[str, Any]]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(
+    results: dict[str, Any],
+    baseline: dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE,
+) -> list[str]:
+    """
+    Return a message for each scenario in both `results` and `baseline` whose
+    real-time factor fell, or whose peak RSS grew, by more than `tolerance`.
+    """
+    regressions = []
+    for name, result in results["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        if result["realtime_factor"] < before["realtime_factor"] * (1.0 - tolerance):
+            regressions.append(
+                f"{name}: {result['realtime_factor']:.2f}x real time, "
+                f"baseline {before['realtime_factor']:.2f}x")
+        if (result["peak_rss_mb"] is not None and before["peak_rss_mb"] is not None
+                and result["peak_rss_mb"] > before["peak_rss_mb"] * (1.0 + tolerance)):
+            regressions.append(
+                f"{name}: peak RSS {result['peak_rss_mb']:.0f} MB, "
+                f"baseline {before['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def format_table(results: dict[str, Any], baseline: Optional[dict[str, Any]] = None) -> str:
+    lines = [
+        f"{'scenario':<24s} {'build s':>8s} {'wall s':>8s} {'x real':>8s} {'vs base':>8s} "
+        f"{'RSS MB':>8s} {'p50 ms':>8s} {'p99 ms':>8s} {'max ms':>8s}"]
+    for name, result in results["scenarios"].items():
+        before = None if baseline is None else baseline["scenarios"].get(name)
+        change = "" if before is None else (
+            f"{result['realtime_factor'] / before['realtime_factor'] - 1.0:+.1%}")
+        rss = result["peak_rss_mb"]
+        block_ms = result["block_ms"]
+        lines.append(
+            f"{name:<24s} {result.get('build_seconds', math.nan):8.2f} "
+            f"{result['wall_seconds']:8.2f} {result['realtime_factor']:8.2f} "
+            f"{change:>8s} {'-' if rss is None else f'{rss:.0f}':>8s} "
+            f"{block_ms['p50']:8.2f} {block_ms['p99']:8.2f} {block_ms['max']:8.2f}")
+    return "\n".join(lines)
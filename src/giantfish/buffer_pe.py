@@ -0,0 +1,42 @@
+"""A source PE that plays back a pre-rendered sample buffer."""
+from __future__ import annotations
+
+import numpy as np
+import pygmu2 as pg
+
+
+class BufferPE(pg.SourcePE):
+    """
+    Serve a (frames, channels) array as a finite-extent source starting at
+    sample `start`.  Requests outside the buffer are zero-filled.  Memory-mapped
+    arrays are used as-is, so only the requested window is paged in.
+    """
+
+    def __init__(self, data: np.ndarray, start: int = 0):
+        super().__init__()
+        data = np.asarray(data)
+        if data.ndim == 1:
+            data = data[:, np.newaxis]
+        self._data = data
+        self._start = int(start)
+
+    @property
+    def data(self) -> np.ndarray:
+        return self._data
+
+    def _compute_extent(self) -> pg.Extent:
+        return pg.Extent(self._start, self._start + len(self._data))
+
+    def channel_count(self) -> int:
+        return self._data.shape[1]
+
+    def is_pure(self) -> bool:
+        return True
+
+    def _render(self, start: int, duration: int) -> pg.Snippet:
+        out = np.zeros((duration, self._data.shape[1]), dtype=np.float32)
+        lo = max(start, self._start)
+        hi = min(start + duration, self._start + len(self._data))
+        if lo < hi:
+            out[lo - start:hi - start] = self._data[lo - self._start:hi - self._start]
+        return pg.Snippet(start, out)
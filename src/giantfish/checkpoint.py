@@ -0,0 +1,182 @@
+"""Snapshots of DSP state, for resuming a render partway through."""
+from __future__ import annotations
+
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import pygmu2 as pg
+from pygmu2.logger import get_logger
+
+from giantfish.config import CACHE_DIR
+from giantfish.graph_hash import graph_digest
+from giantfish.render import DEFAULT_BLOCK_SIZE
+
+logger = get_logger(__name__)
+
+CHECKPOINT_DIR = CACHE_DIR / "checkpoints"
+
+
+def graph_nodes(graph: pg.ProcessingElement) -> list[pg.ProcessingElement]:
+    """Every distinct PE reachable from `graph`, in depth-first order."""
+    nodes: list[pg.ProcessingElement] = []
+    seen: set[int] = set()
+    stack = [graph]
+    while stack:
+        pe = stack.pop()
+        if id(pe) in seen:
+            continue
+        seen.add(id(pe))
+        nodes.append(pe)
+        stack.extend(reversed(pe.inputs()))
+    return nodes
+
+
+def _is_state(value: Any) -> bool:
+    if isinstance(value, pg.ProcessingElement) or isinstance(value, np.memmap):
+        return False
+    if isinstance(value, (list, tuple, set)):
+        return all(_is_state(item) for item in value)
+    if isinstance(value, dict):
+        return all(_is_state(item) for item in value.values())
+    return True
+
+
+def get_state(pe: pg.ProcessingElement) -> dict[str, Any]:
+    """
+    Return a picklable snapshot of `pe`'s own state.  PEs can define
+    `get_state()`/`set_state()`; otherwise the snapshot is every attribute
+    that doesn't refer to other PEs (or to memory-mapped files) and pickles.
+    """
+    method = getattr(pe, "get_state", None)
+    if method is not None:
+        return method()
+    state = {}
+    for name, value in vars(pe).items():
+        if not _is_state(value):
+            continue
+        try:
+            state[name] = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            continue
+    return {"__vars__": state}
+
+
+def set_state(pe: pg.ProcessingElement, state: dict[str, Any]) -> None:
+    """Restore a snapshot taken by `get_state()`."""
+    method = getattr(pe, "set_state", None)
+    if method is not None:
+        method(state)
+        return
+    for name, blob in state["__vars__"].items():
+        setattr(pe, name, pickle.loads(blob))
+
+
+class CheckpointStore:
+    """
+    Snapshots of every stateful node of `graph`, taken every `interval`
+    samples from the start of the graph (`origin` if it has no start) during
+    a render that started at the beginning, and stored under
+    `root`/<graph digest>/.
+
+    `render(start, end)` resumes from the latest checkpoint at or before
+    `start` (or renders from the beginning, taking checkpoints on the way),
+    so re-rendering the end of a long piece only replays from the nearest
+    checkpoint, bit-exactly continuous with the full render.
+
+    The graph digest is taken when the store is created, so create it
+    before rendering anything from `graph`.
+    """
+
+    def __init__(
+        self,
+        graph: pg.ProcessingElement,
+        sample_rate: int,
+        interval: int,
+        origin: int = 0,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        root: Optional[Path] = None,
+    ):
+        self.graph = graph
+        self.sample_rate = sample_rate
+        self.block_size = block_size
+        # Checkpoints fall on block boundaries counted from the origin, so
+        # resumed renders are cut into the same blocks as the render that
+        # took them, and those blocks line up with the graph's start.
+        self.interval = max(block_size, interval // block_size * block_size)
+        start = graph.extent().start
+        self.origin = origin if start is None else start
+        self.root = Path(root) if root is not None else CHECKPOINT_DIR
+        self.key = graph_digest(graph, sample_rate, self.origin, self.block_size)
+        self._nodes = graph_nodes(graph)
+
+    @property
+    def directory(self) -> Path:
+        return self.root / self.key
+
+    def path_for(self, position: int) -> Path:
+        return self.directory / f"{position}.pkl"
+
+    def positions(self) -> list[int]:
+        if not self.directory.exists():
+            return []
+        return sorted(int(path.stem) for path in self.directory.glob("*.pkl"))
+
+    def save(self, position: int) -> Path:
+        """Snapshot the graph, which must have been rendered up to `position`."""
+        states = [
+            (index, type(pe).__qualname__, get_state(pe))
+            for index, pe in enumerate(self._nodes)
+            if not pe.is_pure() or hasattr(pe, "get_state")]
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(position)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {"position": position, "states": states}, f,
+                protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return path
+
+    def restore(self, position: int) -> None:
+        with open(self.path_for(position), "rb") as f:
+            checkpoint = pickle.load(f)
+        for index, class_name, state in checkpoint["states"]:
+            pe = self._nodes[index]
+            if type(pe).__qualname__ != class_name:
+                raise ValueError(
+                    f"checkpoint {position} doesn't match graph: node {index} "
+                    f"is {type(pe).__qualname__}, not {class_name}")
+            set_state(pe, state)
+
+    def render(self, start: int, end: int) -> np.ndarray:
+        """Render [start, end) of the graph, resuming from a checkpoint if possible."""
+        earlier = [p for p in self.positions() if self.origin < p <= start]
+        lo = earlier[-1] if earlier else min(self.origin, start)
+
+        out = None
+        renderer = pg.NullRenderer(sample_rate=self.sample_rate)
+        renderer.set_source(self.graph)
+        with renderer:
+            renderer.start()
+            if earlier:
+                self.restore(lo)
+                logger.info(f"Resuming from checkpoint at sample {lo}")
+            pos = lo
+            while pos < end:
+                boundary = self.origin + ((pos - self.origin) // self.interval + 1) * self.interval
+                n = min(self.block_size, end - pos, boundary - pos)
+                data = self.graph.render(pos, n).data
+                if out is None:
+                    out = np.zeros((end - start, data.shape[1]), dtype=np.float32)
+                if pos + n > start:
+                    first = max(pos, start)
+                    out[first - start:pos + n - start] = data[first - pos:]
+                pos += n
+                if pos == boundary and not self.path_for(pos).exists():
+                    self.save(pos)
+        if out is None:
+            out = np.zeros((end - start, self.graph.channel_count() or 1), dtype=np.float32)
+        return out
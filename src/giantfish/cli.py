@@ -2,17 +2,111 @@
 from __future__ import annotations
 
 import argparse
+from pathlib import Path
+
+import pygmu2 as pg
+
+from giantfish import bench
+from giantfish.config import ASSETS_DIR
+from giantfish.convolution_pe import DEFAULT_PARTITION_SIZE
+from giantfish.ir_cache import ir_spectra
+from giantfish.manifest import AssetManifest
+
+DEFAULT_SAMPLE_RATE = 44100
+
+
+def _warm_ir_cache(args: argparse.Namespace) -> int:
+    pg.set_sample_rate(args.sample_rate)
+    paths = sorted((ASSETS_DIR / "impulses").glob("*.wav"))
+    for path in paths:
+        spectra = ir_spectra(pg.WavReaderPE(str(path)), args.partition_size, args.sample_rate)
+        print(f"{path.name}: {spectra.shape[0]} partitions")
+    return 0
+
+
+def _verify_assets(args: argparse.Namespace) -> int:
+    manifest = AssetManifest.default()
+    bad = manifest.verify(max_workers=args.jobs)
+    for entry in bad:
+        print(f"MISMATCH {entry.name} ({entry.path})")
+    print(f"{len(manifest.entries()) - len(bad)} ok, {len(bad)} bad")
+    return 1 if bad else 0
+
+
+def _bench(args: argparse.Namespace) -> int:
+    if args.list:
+        for scenario in bench.SCENARIOS.values():
+            print(f"{scenario.name:<24s} {scenario.description}")
+        return 0
+    results = bench.run_suite(
+        args.scenario or None, args.sample_rate, args.block_size, args.seconds)
+    baseline = bench.load_results(args.baseline)
+    print(bench.format_table(results, baseline))
+    bench.save_results(results, args.output)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        bench.save_results(results, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if baseline is None:
+        print("No baseline to compare against (save one with --save-baseline)")
+        return 0
+    regressions = bench.compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
 
 
 def main() -> int:
     parser = argparse.ArgumentParser(description="GiantFish CLI")
     parser.add_argument("--version", action="store_true", help="Show version and exit")
+    subparsers = parser.add_subparsers(dest="command")
+
+    warm = subparsers.add_parser(
+        "warm-ir-cache",
+        help="Precompute partitioned spectra for every IR in data/assets/impulses")
+    warm.add_argument("--partition-size", type=int, default=DEFAULT_PARTITION_SIZE)
+    warm.add_argument("--sample-rate", type=int, default=DEFAULT_SAMPLE_RATE)
+    warm.set_defaults(func=_warm_ir_cache)
+
+    verify = subparsers.add_parser(
+        "verify-assets",
+        help="Rehash every asset in the local asset manifest")
+    verify.add_argument("--jobs", type=int, default=None)
+    verify.set_defaults(func=_verify_assets)
+
+    bench_parser = subparsers.add_parser(
+        "bench",
+        help="Time renders of fixed scenarios and compare against a baseline")
+    bench_parser.add_argument(
+        "--scenario", action="append", default=[],
+        help="Scenario to run (repeatable; default: all, see --list)")
+    bench_parser.add_argument("--list", action="store_true", help="List scenarios and exit")
+    bench_parser.add_argument(
+        "--seconds", type=float, default=None,
+        help="Render at most this many seconds of each scenario")
+    bench_parser.add_argument("--sample-rate", type=int, default=DEFAULT_SAMPLE_RATE)
+    bench_parser.add_argument("--block-size", type=int, default=bench.DEFAULT_BLOCK_SIZE)
+    bench_parser.add_argument("--output", type=Path, default=bench.RESULTS_PATH)
+    bench_parser.add_argument("--baseline", type=Path, default=bench.BASELINE_PATH)
+    bench_parser.add_argument(
+        "--save-baseline", action="store_true",
+        help="Store these results as the new baseline instead of comparing")
+    bench_parser.add_argument(
+        "--tolerance", type=float, default=bench.DEFAULT_TOLERANCE,
+        help="Fractional slowdown (or RSS growth) reported as a regression "
+             f"(default: {bench.DEFAULT_TOLERANCE})")
+    bench_parser.set_defaults(func=_bench)
+
     args = parser.parse_args()
 
     if args.version:
         print("giantfish 0.1.0")
         return 0
 
+    if args.command is not None:
+        return args.func(args)
+
     parser.print_help()
     return 0
 
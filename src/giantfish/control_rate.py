@@ -0,0 +1,118 @@
+"""Run slowly varying modulators at a control rate."""
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pygmu2 as pg
+
+DEFAULT_CONTROL_PERIOD = 64
+
+
+class ControlRatePE(pg.ProcessingElement):
+    """
+    Tag `mod` as a control-rate modulator evaluated once every `period`
+    samples.
+
+    `mod` runs in control time: its sample k is the control value at audio
+    sample k * period, so anything `mod` does per sample (a random walk's
+    step, a slew) now happens per control tick.  Scale a deterministic rate
+    by `period` to keep the same speed, but a random walk's step by
+    sqrt(`period`): its spread grows with the square root of the number of
+    steps, not linearly.
+
+    Rendered as an ordinary PE, the control values are linearly interpolated
+    to audio rate.  Consumers that know about control rate (see
+    giantfish.panner) call `control_points()` instead and do their own
+    per-tick work, interpolating only the final result.
+    """
+
+    def __init__(self, mod: pg.ProcessingElement, period: int = DEFAULT_CONTROL_PERIOD):
+        super().__init__()
+        if period < 1:
+            raise ValueError("period must be at least 1 sample")
+        self._mod = mod
+        self._period = int(period)
+        self._reset_state()
+
+    @property
+    def mod(self) -> pg.ProcessingElement:
+        return self._mod
+
+    @property
+    def period(self) -> int:
+        return self._period
+
+    def inputs(self) -> list[pg.ProcessingElement]:
+        return [self._mod]
+
+    def is_pure(self) -> bool:
+        return self._mod.is_pure()
+
+    def channel_count(self) -> Optional[int]:
+        return self._mod.channel_count()
+
+    def _compute_extent(self) -> pg.Extent:
+        extent = self._mod.extent()
+        return pg.Extent(
+            None if extent.start is None else extent.start * self._period,
+            None if extent.end is None else (extent.end - 1) * self._period + 1)
+
+    def _reset_state(self) -> None:
+        self._first_tick: Optional[int] = None
+        self._values: Optional[np.ndarray] = None
+
+    def control_points(self, start: int, duration: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return (times, values) for the control ticks that bracket
+        [start, start + duration): audio-sample times of shape (T,) and
+        control values of shape (T, channels).
+        """
+        period = self._period
+        first = start // period
+        last = -(-(start + duration - 1) // period)
+        # Consecutive blocks share their boundary tick; keep the mod's stream
+        # contiguous by rendering only ticks not already seen.
+        cached = self._values
+        if cached is not None and self._first_tick <= first <= self._first_tick + len(cached):
+            have = self._first_tick + len(cached)
+            keep = cached[first - self._first_tick:]
+            if last >= have:
+                fresh = self._mod.render(have, last + 1 - have).data
+                keep = np.concatenate([keep, fresh])
+            values = keep
+        else:
+            values = self._mod.render(first, last + 1 - first).data
+        self._first_tick = first
+        self._values = values
+        times = np.arange(first, last + 1) * period
+        return times, values[:last + 1 - first]
+
+    def _render(self, start: int, duration: int) -> pg.Snippet:
+        times, values = self.control_points(start, duration)
+        out = np.empty((duration, values.shape[1]), dtype=np.float32)
+        for channel in range(values.shape[1]):
+            out[:, channel] = interpolate_ticks(times, values[:, channel], start, duration)
+        return pg.Snippet(start, out)
+
+
+def interpolate_ticks(
+    times: np.ndarray,
+    values: np.ndarray,
+    start: int,
+    duration: int,
+) -> np.ndarray:
+    """
+    Linearly interpolate one channel of evenly spaced control points, as
+    returned by `ControlRatePE.control_points()`, over [start, start +
+    duration).  Uses the fixed spacing instead of searching like np.interp.
+    """
+    values = np.asarray(values, dtype=np.float32)
+    if len(times) == 1:
+        return np.full(duration, values[0], dtype=np.float32)
+    period = int(times[1] - times[0])
+    ramp = np.arange(period, dtype=np.float32) * np.float32(1.0 / period)
+    steps = np.diff(values)
+    grid = np.append((values[:-1, np.newaxis] + steps[:, np.newaxis] * ramp).ravel(), values[-1])
+    offset = start - int(times[0])
+    return grid[offset:offset + duration]
@@ -0,0 +1,216 @@
+"""Structural hashing of PE graphs and the asset files they read."""
+from __future__ import annotations
+
+import enum
+import functools
+import hashlib
+import inspect
+import os
+import types
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+import pygmu2 as pg
+
+_CHUNK_SIZE = 1 << 20
+
+# path -> (size, mtime_ns, digest).  Avoids rehashing large WAVs that are
+# referenced from several places in one graph.
+_file_digests: dict[str, tuple[int, int, str]] = {}
+
+
+def file_digest(path: str | os.PathLike) -> str:
+    """Return the sha256 hex digest of a file's contents."""
+    path = os.fspath(path)
+    st = os.stat(path)
+    cached = _file_digests.get(path)
+    if cached is not None and cached[:2] == (st.st_size, st.st_mtime_ns):
+        return cached[2]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _file_digests[path] = (st.st_size, st.st_mtime_ns, digest)
+    return digest
+
+
+def graph_digest(source: pg.ProcessingElement, *extra: Any) -> str:
+    """
+    Return a sha256 hex digest identifying the structure of the graph rooted
+    at `source`: node types, their parameters, how nodes are shared, and the
+    contents of any files they reference.  `extra` values (e.g. sample rate,
+    render window) are folded into the digest.
+    """
+    hasher = _GraphHasher()
+    hasher.feed(source)
+    for value in extra:
+        hasher.feed(value)
+    return hasher.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def _init_parameters(cls: type) -> Optional[tuple[str, ...]]:
+    """Names of the parameters of `cls.__init__`, or None if it takes **kwargs."""
+    try:
+        parameters = list(inspect.signature(cls.__init__).parameters.values())[1:]
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind is inspect.Parameter.VAR_KEYWORD for p in parameters):
+        return None
+    return tuple(p.name for p in parameters)
+
+
+def hashable_attrs(obj: Any) -> dict[str, Any]:
+    """
+    The attributes of `obj` that define it, as opposed to render state.
+
+    Objects can declare them with a `hash_params()` method returning a dict.
+    For other PEs they are the constructor's parameters, found as attributes
+    called `name` or `_name`; positions, pending buffers and caches set up
+    while rendering are left out, so a rendered graph hashes like a fresh
+    one.  If any parameter can't be found that way, or for objects that
+    aren't PEs, every attribute is used.
+    """
+    method = getattr(obj, "hash_params", None)
+    if method is not None:
+        return method()
+    attrs = vars(obj)
+    if isinstance(obj, pg.ProcessingElement):
+        names = _init_parameters(type(obj))
+        if names is not None:
+            params = {}
+            for name in names:
+                attr = name if name in attrs else f"_{name}"
+                if attr not in attrs:
+                    break
+                params[name] = attrs[attr]
+            else:
+                return params
+    return attrs
+
+
+class _GraphHasher:
+
+    def __init__(self):
+        self._h = hashlib.sha256()
+        self._seen: dict[int, int] = {}
+
+    def hexdigest(self) -> str:
+        return self._h.hexdigest()
+
+    def _emit(self, tag: str, payload: str | bytes = b"") -> None:
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        self._h.update(tag.encode("ascii"))
+        self._h.update(len(payload).to_bytes(8, "little"))
+        self._h.update(payload)
+
+    def feed(self, value: Any) -> None:
+        if value is None or isinstance(value, (bool, int, float, complex)):
+            self._emit("n", repr(value))
+        elif isinstance(value, enum.Enum):
+            self._emit("e", f"{_qualname(type(value))}.{value.name}")
+        elif isinstance(value, (str, Path)):
+            self._feed_path_or_str(value)
+        elif isinstance(value, bytes):
+            self._emit("b", value)
+        elif isinstance(value, np.memmap):
+            # Identified by the mapped file's contents (hashed once per file)
+            # rather than by reading the whole mapping into memory.
+            self._emit("a", f"{value.dtype.str}{value.shape}")
+            self._emit("M", f"{file_digest(value.filename)}:{value.offset}")
+        elif isinstance(value, np.ndarray):
+            self._emit("a", f"{value.dtype.str}{value.shape}")
+            self._feed_array_data(value)
+        elif isinstance(value, np.generic):
+            self._emit("n", repr(value.item()))
+        elif isinstance(value, (list, tuple)):
+            self._emit("l", str(len(value)))
+            for item in value:
+                self.feed(item)
+        elif isinstance(value, dict):
+            self._emit("m", str(len(value)))
+            for key in sorted(value, key=repr):
+                self.feed(key)
+                self.feed(value[key])
+        elif isinstance(value, types.CodeType):
+            self._feed_code(value)
+        elif callable(value) and hasattr(value, "__qualname__"):
+            self._feed_callable(value)
+        elif hasattr(value, "__dict__"):
+            self._feed_object(value)
+        else:
+            text = repr(value)
+            self._emit("o", _qualname(type(value)) if " at 0x" in text else text)
+
+    def _feed_array_data(self, value: np.ndarray) -> None:
+        data = np.ascontiguousarray(value)
+        try:
+            view = memoryview(data).cast("B")
+        except (TypeError, ValueError):  # object arrays etc.
+            view = data.tobytes()
+        # Hash the buffer in place rather than copying it with tobytes()
+        self._h.update(b"d")
+        self._h.update(data.nbytes.to_bytes(8, "little"))
+        self._h.update(view)
+
+    def _feed_path_or_str(self, value: str | Path) -> None:
+        # Strings naming an existing file are treated as asset references.
+        try:
+            is_file = os.path.isfile(value)
+        except (OSError, ValueError):
+            is_file = False
+        if is_file:
+            self._emit("p", file_digest(value))
+        else:
+            self._emit("s", str(value))
+
+    def _feed_callable(self, fn: Any) -> None:
+        # Functions hash by their bytecode, constants, defaults and closure
+        # values as well as their name, so editing a lambda's body changes
+        # the digest.  Globals they read are not followed.
+        self._emit("f", f"{getattr(fn, '__module__', '')}.{fn.__qualname__}")
+        index = self._seen.get(id(fn))
+        if index is not None:
+            self._emit("r", str(index))
+            return
+        self._seen[id(fn)] = len(self._seen)
+        if isinstance(fn, types.MethodType):
+            self.feed(fn.__self__)
+            fn = fn.__func__
+        code = getattr(fn, "__code__", None)
+        if code is None:
+            return
+        self._feed_code(code)
+        self.feed(getattr(fn, "__defaults__", None))
+        self.feed(getattr(fn, "__kwdefaults__", None))
+        for cell in getattr(fn, "__closure__", None) or ():
+            try:
+                self.feed(cell.cell_contents)
+            except ValueError:  # empty cell
+                self._emit("n", "<empty>")
+
+    def _feed_code(self, code: types.CodeType) -> None:
+        self._emit("x", code.co_code)
+        self.feed(code.co_consts)
+        self.feed(code.co_names)
+
+    def _feed_object(self, obj: Any) -> None:
+        # Shared nodes hash as back-references, so a graph that reuses one
+        # WavReaderPE differs from one that opens the file twice.
+        index = self._seen.get(id(obj))
+        if index is not None:
+            self._emit("r", str(index))
+            return
+        self._seen[id(obj)] = len(self._seen)
+        attrs = hashable_attrs(obj)
+        self._emit("c", f"{_qualname(type(obj))}:{len(attrs)}")
+        for name in sorted(attrs):
+            self._emit("k", name)
+            self.feed(attrs[name])
+
+
+def _qualname(cls: type) -> str:
+    return f"{cls.__module__}.{cls.__qualname__}"
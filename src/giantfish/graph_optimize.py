@@ -0,0 +1,260 @@
+"""Merge duplicate subgraphs and evaluate shared nodes once per window."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Mapping, Optional
+
+import numpy as np
+import pygmu2 as pg
+from pygmu2.logger import get_logger
+
+from giantfish.checkpoint import graph_nodes
+from giantfish.control_rate import ControlRatePE
+from giantfish.convolution_pe import PartitionedConvolutionPE
+from giantfish.graph_hash import graph_digest, hashable_attrs
+
+logger = get_logger(__name__)
+
+
+class SharedPE(pg.ProcessingElement):
+    """
+    Pass-through that remembers what it rendered, so several consumers of one
+    (possibly stateful) source pull it only once.
+
+    It keeps a contiguous window of the source ending at the newest sample
+    rendered, as long as the longest request plus `history` samples.
+    Requests inside the window are served as a view of it, and requests that
+    run past its end render only the samples after it.  So consumers that
+    read at different positions -- a convolver pulling a partition ahead of
+    the dry path, say -- still see one contiguous stream of requests on the
+    source, as long as they stay within `history` samples of each other.
+    """
+
+    def __init__(self, src: pg.ProcessingElement, history: int = 0):
+        super().__init__()
+        self._src = src
+        self._history = int(history)
+        self._window: Optional[np.ndarray] = None
+        self._window_start = 0
+        self._longest = 0
+        self.hits = 0
+
+    @property
+    def src(self) -> pg.ProcessingElement:
+        return self._src
+
+    @property
+    def history(self) -> int:
+        return self._history
+
+    def inputs(self) -> list[pg.ProcessingElement]:
+        return [self._src]
+
+    def is_pure(self) -> bool:
+        return self._src.is_pure()
+
+    def preroll_samples(self) -> int:
+        return 0
+
+    def channel_count(self) -> Optional[int]:
+        return self._src.channel_count()
+
+    def _compute_extent(self) -> pg.Extent:
+        return self._src.extent()
+
+    def _reset_state(self) -> None:
+        self._window = None
+        self._window_start = 0
+        self._longest = 0
+
+    def get_state(self) -> dict:
+        # Saved even when the source is pure: the window may hold samples a
+        # stateful node upstream has already moved past.
+        return {
+            "window": self._window,
+            "window_start": self._window_start,
+            "longest": self._longest,
+        }
+
+    def set_state(self, state: dict) -> None:
+        self._window = state["window"]
+        self._window_start = state["window_start"]
+        self._longest = state["longest"]
+
+    def _render(self, start: int, duration: int) -> pg.Snippet:
+        self._longest = max(self._longest, duration)
+        window = self._window
+        offset = start - self._window_start
+        if window is not None and 0 <= offset <= len(window):
+            if offset + duration <= len(window):
+                self.hits += 1
+                return pg.Snippet(start, window[offset:offset + duration])
+            # Continue the source from the end of the window.
+            end = self._window_start + len(window)
+            tail = self._src.render(end, start + duration - end).data
+            window = np.concatenate((window, tail))
+        else:
+            window = self._src.render(start, duration).data
+            self._window_start = start
+        excess = len(window) - (self._longest + self._history)
+        if excess > 0:
+            window = window[excess:]
+            self._window_start += excess
+        self._window = window
+        offset = start - self._window_start
+        return pg.Snippet(start, window[offset:offset + duration])
+
+
+@dataclass
+class GraphOptimization:
+    """What optimize_graph() changed.  `evaluations_saved` counts renders
+    served from a SharedPE's cache so far, in this process."""
+    nodes_before: int
+    nodes_after: int
+    merged: int
+    shared: list[SharedPE] = field(default_factory=list)
+
+    @property
+    def evaluations_saved(self) -> int:
+        return sum(pe.hits for pe in self.shared)
+
+    def __str__(self) -> str:
+        return (f"{self.nodes_before} nodes -> {self.nodes_after}: "
+                f"{self.merged} duplicates merged, {len(self.shared)} shared nodes, "
+                f"{self.evaluations_saved} evaluations saved")
+
+
+def _swap(value: Any, mapping: Mapping[int, pg.ProcessingElement]) -> Any:
+    """`value` with every PE in `mapping` (by id) replaced, or `value` itself."""
+    if isinstance(value, pg.ProcessingElement):
+        return mapping.get(id(value), value)
+    if isinstance(value, (list, tuple)):
+        items = [_swap(item, mapping) for item in value]
+        if any(new is not old for new, old in zip(items, value)):
+            return type(value)(items) if isinstance(value, list) else tuple(items)
+    elif isinstance(value, dict):
+        items = {key: _swap(item, mapping) for key, item in value.items()}
+        if any(items[key] is not item for key, item in value.items()):
+            return items
+    return value
+
+
+def _rewire(pe: pg.ProcessingElement, mapping: Mapping[int, pg.ProcessingElement]) -> None:
+    for name, value in list(vars(pe).items()):
+        new = _swap(value, mapping)
+        if new is not value:
+            setattr(pe, name, new)
+
+
+def _params(value: Any, keys: Mapping[int, str]) -> Any:
+    """`value` with PEs replaced by their structural keys, for hashing."""
+    if isinstance(value, pg.ProcessingElement):
+        # PEs held without being inputs hash whole
+        key = keys.get(id(value))
+        return ("pe", key if key is not None else graph_digest(value))
+    if isinstance(value, (list, tuple)):
+        return [_params(item, keys) for item in value]
+    if isinstance(value, dict):
+        return {key: _params(item, keys) for key, item in value.items()}
+    return value
+
+
+def _structural_key(pe: pg.ProcessingElement, keys: Mapping[int, str]) -> str:
+    attrs = {name: _params(value, keys) for name, value in hashable_attrs(pe).items()}
+    return graph_digest(f"{type(pe).__module__}.{type(pe).__qualname__}", attrs)
+
+
+def _postorder(roots: list[pg.ProcessingElement]) -> list[pg.ProcessingElement]:
+    order: list[pg.ProcessingElement] = []
+    seen: set[int] = set()
+    stack: list[tuple[pg.ProcessingElement, bool]] = [(pe, False) for pe in reversed(roots)]
+    while stack:
+        pe, expanded = stack.pop()
+        if expanded:
+            order.append(pe)
+            continue
+        if id(pe) in seen:
+            continue
+        seen.add(id(pe))
+        stack.append((pe, True))
+        stack.extend((child, False) for child in reversed(pe.inputs()) if id(child) not in seen)
+    return order
+
+
+def _count_nodes(roots: list[pg.ProcessingElement]) -> int:
+    return len({id(pe) for root in roots for pe in graph_nodes(root)})
+
+
+def optimize_graph(
+    roots: Mapping[str, pg.ProcessingElement],
+) -> tuple[dict[str, pg.ProcessingElement], GraphOptimization]:
+    """
+    Rewrite the graphs in `roots` in place so that no work is repeated
+    within a block, and return the new roots (same keys) and a report.
+
+    1. Pure subgraphs that are structurally identical (same node types and
+       parameters over the same inputs, e.g. one asset slice loaded twice)
+       are merged into one.  Stateful nodes are never merged: two random
+       walks or two compressors fed by different consumers must stay apart.
+    2. Every remaining node pulled by more than one consumer is wrapped in a
+       SharedPE, so a window requested by several consumers is rendered once,
+       and consumers reading ahead of the others (partitioned convolvers)
+       don't make the source seek backwards.
+
+    Call it once the graphs are built and before anything is rendered.
+    """
+    names = list(roots)
+    graphs = [roots[name] for name in names]
+    nodes_before = _count_nodes(graphs)
+
+    keys: dict[int, str] = {}
+    canonical: dict[str, pg.ProcessingElement] = {}
+    merged: dict[int, pg.ProcessingElement] = {}
+    for pe in _postorder(graphs):
+        # Inputs were visited first, so already point at their survivors.
+        _rewire(pe, merged)
+        key = keys[id(pe)] = _structural_key(pe, keys)
+        if not pe.is_pure():
+            continue
+        survivor = canonical.setdefault(key, pe)
+        if survivor is not pe:
+            merged[id(pe)] = survivor
+    graphs = [merged.get(id(pe), pe) for pe in graphs]
+    nodes_merged = nodes_before - _count_nodes(graphs)
+
+    consumers: dict[int, list[pg.ProcessingElement]] = {}
+    nodes: dict[int, pg.ProcessingElement] = {}
+    for root in graphs:
+        consumers.setdefault(id(root), []).append(None)
+        for pe in graph_nodes(root):
+            if id(pe) in nodes:
+                continue
+            nodes[id(pe)] = pe
+            for child in pe.inputs():
+                consumers.setdefault(id(child), []).append(pe)
+
+    shared: dict[int, SharedPE] = {}
+    for key, users in consumers.items():
+        pe = nodes[key]
+        if len(users) < 2 or isinstance(pe, (SharedPE, ControlRatePE)):
+            continue
+        # A cached window is no cheaper than re-reading a pure source.
+        if pe.is_pure() and not pe.inputs():
+            continue
+        # Convolvers read up to a partition ahead of the other consumers.
+        history = max(
+            (user.partition_size for user in users
+             if isinstance(user, PartitionedConvolutionPE)),
+            default=0)
+        shared[key] = SharedPE(pe, history=history)
+    for pe in nodes.values():
+        _rewire(pe, shared)
+    graphs = [shared.get(id(pe), pe) for pe in graphs]
+
+    report = GraphOptimization(
+        nodes_before=nodes_before,
+        nodes_after=_count_nodes(graphs),
+        merged=nodes_merged,
+        shared=list(shared.values()))
+    logger.info(f"Graph optimization: {report}")
+    return dict(zip(names, graphs)), report
@@ -0,0 +1,71 @@
+"""Persistent cache of partitioned impulse-response spectra."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pygmu2 as pg
+from pygmu2.logger import get_logger
+
+from giantfish.config import CACHE_DIR
+from giantfish.graph_hash import graph_digest
+from giantfish.render import render_to_array
+
+logger = get_logger(__name__)
+
+IR_CACHE_DIR = CACHE_DIR / "ir_spectra"
+
+
+def partition_ir(ir: np.ndarray, partition_size: int) -> np.ndarray:
+    """
+    Split a (frames, channels) impulse response into partitions of
+    `partition_size` samples and return their spectra as a complex64 array of
+    shape (partitions, partition_size + 1, channels).  Each partition is
+    zero-padded to 2 * partition_size, as overlap-save requires.
+    """
+    ir = np.asarray(ir, dtype=np.float32)
+    if ir.ndim == 1:
+        ir = ir[:, np.newaxis]
+    n_parts = max(1, -(-len(ir) // partition_size))
+    padded = np.zeros((n_parts * partition_size, ir.shape[1]), dtype=np.float32)
+    padded[:len(ir)] = ir
+    parts = padded.reshape(n_parts, partition_size, ir.shape[1])
+    return np.fft.rfft(parts, n=2 * partition_size, axis=1).astype(np.complex64)
+
+
+def ir_spectra(
+    ir: pg.ProcessingElement,
+    partition_size: int,
+    sample_rate: int,
+    ir_data: Optional[Callable[[], np.ndarray]] = None,
+    root: Optional[Path] = None,
+) -> np.ndarray:
+    """
+    Return the partitioned spectra of `ir` (see `partition_ir()`) as a
+    read-only memory-mapped array, computing and storing them on first use.
+
+    Entries are keyed by the IR's graph digest (which covers the contents of
+    the WAV file it reads), the partition size and the sample rate.  Because
+    the array is memory-mapped, worker processes convolving with the same IR
+    share a single copy through the page cache.
+
+    `ir_data` returns the IR samples on a cache miss; by default the IR is
+    rendered over its extent.
+    """
+    root = Path(root) if root is not None else IR_CACHE_DIR
+    key = graph_digest(ir, partition_size, sample_rate)
+    path = root / f"{key}.npy"
+    if not path.exists():
+        if ir_data is None:
+            extent = ir.extent()
+            data = render_to_array(ir, extent.start, extent.duration, sample_rate)
+        else:
+            data = ir_data()
+        logger.info(f"Caching IR spectra for {ir} ({partition_size} sample partitions)")
+        root.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, partition_ir(data, partition_size))
+        os.replace(tmp_path, path)
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,96 @@
+"""Loops served from one in-memory rendering of their period."""
+from __future__ import annotations
+
+from typing import Optional
+
+import numpy as np
+import pygmu2 as pg
+from pygmu2.logger import get_logger
+
+from giantfish.graph_hash import graph_digest
+from giantfish.render import render_to_array
+
+logger = get_logger(__name__)
+
+# Periods larger than this (in bytes of float32 samples) are streamed.
+DEFAULT_MAX_BYTES = 256 << 20
+
+
+class MaterializedLoopPE(pg.ProcessingElement):
+    """
+    Loop the finite extent of `src` forever, like pg.LoopPE, but render one
+    period of `src` into memory up front and serve every pass from that
+    buffer: a block inside one period is a view of it, a block spanning the
+    wrap is stitched from the end and the start.  `src` and whatever it
+    processes are rendered exactly once, however long the loop plays.
+
+    `src` is rendered in isolation from its own start, so it shouldn't also
+    feed other parts of the graph if it is stateful.  If one period would
+    take more than `max_bytes`, or `src` has no finite extent, the loop falls
+    back to streaming through pg.LoopPE.
+    """
+
+    def __init__(self, src: pg.ProcessingElement, max_bytes: int = DEFAULT_MAX_BYTES):
+        super().__init__()
+        extent = src.extent()
+        # Taken before `src` is rendered, which may change its state
+        self._src_digest = graph_digest(src)
+        self._max_bytes = max_bytes
+        self._loop: Optional[pg.ProcessingElement] = None
+        self._buffer: Optional[np.ndarray] = None
+        self._origin = 0
+        size = None
+        if extent.start is not None and extent.end is not None:
+            size = (extent.end - extent.start) * (src.channel_count() or 1) * 4
+        if size is None or size > max_bytes or extent.end <= extent.start:
+            logger.info(f"Streaming loop of {src}: period too long to hold in memory")
+            self._loop = pg.LoopPE(src)
+        else:
+            self._origin = extent.start
+            self._buffer = render_to_array(
+                src, extent.start, extent.end - extent.start, src.sample_rate)
+            # Blocks are views of the buffer; consumers must not write to them
+            self._buffer.setflags(write=False)
+
+    @property
+    def period(self) -> Optional[int]:
+        return None if self._buffer is None else len(self._buffer)
+
+    def hash_params(self) -> dict:
+        return {"src": self._src_digest, "max_bytes": self._max_bytes}
+
+    def inputs(self) -> list[pg.ProcessingElement]:
+        return [] if self._loop is None else [self._loop]
+
+    def is_pure(self) -> bool:
+        return True if self._loop is None else self._loop.is_pure()
+
+    def preroll_samples(self) -> int:
+        return 0
+
+    def channel_count(self) -> Optional[int]:
+        if self._loop is not None:
+            return self._loop.channel_count()
+        return self._buffer.shape[1]
+
+    def _compute_extent(self) -> pg.Extent:
+        if self._loop is not None:
+            return self._loop.extent()
+        return pg.Extent(None, None)
+
+    def _render(self, start: int, duration: int) -> pg.Snippet:
+        if self._loop is not None:
+            return self._loop.render(start, duration)
+        buffer = self._buffer
+        period = len(buffer)
+        first = (start - self._origin) % period
+        if first + duration <= period:
+            return pg.Snippet(start, buffer[first:first + duration])
+        out = np.empty((duration, buffer.shape[1]), dtype=np.float32)
+        pos = 0
+        while pos < duration:
+            n = min(period - first, duration - pos)
+            out[pos:pos + n] = buffer[first:first + n]
+            pos += n
+            first = 0
+        return pg.Snippet(start, out)
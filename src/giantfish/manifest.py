@@ -0,0 +1,311 @@
+"""Local manifest of fetched assets, for offline and warm-cache starts."""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from pygmu2.logger import get_logger
+
+from giantfish.config import CACHE_DIR
+from giantfish.graph_hash import file_digest
+from giantfish.prefetch import PerThreadAssetManager
+
+logger = get_logger(__name__)
+
+MANIFEST_PATH = CACHE_DIR / "asset_manifest.json"
+
+
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files"
+DRIVE_METADATA_SCOPES = ["https://www.googleapis.com/auth/drive.metadata.readonly"]
+
+# The OAuth client DriveFiles signs in with, and the token it is granted;
+# both are kept out of the repository in the cache directory.
+DRIVE_CLIENT_SECRETS = CACHE_DIR / "drive_client_secrets.json"
+DRIVE_TOKEN_PATH = CACHE_DIR / "drive_token.json"
+
+
+@dataclass
+class RemoteFile:
+    """What Google Drive reports for an asset: its file id, modifiedTime and md5Checksum."""
+    file_id: str
+    modified_time: Optional[str] = None
+    md5_checksum: Optional[str] = None
+
+
+@dataclass
+class ManifestEntry:
+    name: str
+    key: str
+    file_id: Optional[str]
+    modified_time: Optional[str]
+    md5_checksum: Optional[str]
+    size: int
+    mtime_ns: int
+    sha256: str
+    path: str
+
+
+class AssetManifest:
+    """
+    A JSON record of every asset fetched into the local cache: its name, the
+    key it is looked up by, the Drive file id, modifiedTime and md5Checksum
+    it was fetched at (when known), and the size, mtime, sha256 checksum and
+    path of the local copy.  Safe to update from several threads.
+    """
+
+    _default: Optional[AssetManifest] = None
+
+    def __init__(self, path: Path = MANIFEST_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._entries: dict[str, ManifestEntry] = {}
+        if self.path.exists():
+            with open(self.path) as f:
+                for item in json.load(f)["assets"]:
+                    try:
+                        entry = ManifestEntry(**item)
+                    except TypeError:
+                        # Written by an older version; recorded again on next fetch
+                        continue
+                    self._entries[entry.key] = entry
+
+    @classmethod
+    def default(cls) -> AssetManifest:
+        """Return the process-wide manifest at MANIFEST_PATH."""
+        if cls._default is None:
+            cls._default = cls()
+        return cls._default
+
+    def entries(self) -> list[ManifestEntry]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def lookup(self, key: str, remote: Optional[RemoteFile] = None) -> Optional[Path]:
+        """
+        Return the local path recorded for `key` if the file is still there
+        with the recorded size and mtime, else None.  Given the asset's
+        current `remote` metadata, the entry must also have been fetched
+        from the same Drive file at the same version: same md5Checksum, or
+        same modifiedTime if Drive reports no checksum.  Does not rehash;
+        see `verify()`.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        try:
+            st = os.stat(entry.path)
+        except OSError:
+            return None
+        if (st.st_size, st.st_mtime_ns) != (entry.size, entry.mtime_ns):
+            return None
+        if remote is not None and not _same_version(entry, remote):
+            return None
+        return Path(entry.path)
+
+    def record(
+        self,
+        name: str,
+        key: str,
+        path: Path,
+        remote: Optional[RemoteFile] = None,
+    ) -> ManifestEntry:
+        st = os.stat(path)
+        entry = ManifestEntry(
+            name=name,
+            key=key,
+            file_id=None if remote is None else remote.file_id,
+            modified_time=None if remote is None else remote.modified_time,
+            md5_checksum=None if remote is None else remote.md5_checksum,
+            size=st.st_size,
+            mtime_ns=st.st_mtime_ns,
+            sha256=file_digest(path),
+            path=str(path))
+        with self._lock:
+            self._entries[key] = entry
+            self._save()
+        return entry
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        assets = [asdict(e) for e in sorted(self._entries.values(), key=lambda e: e.key)]
+        with open(tmp_path, "w") as f:
+            json.dump({"assets": assets}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def verify(self, max_workers: Optional[int] = None) -> list[ManifestEntry]:
+        """
+        Rehash every recorded file in parallel and return the entries whose
+        file is missing or whose checksum no longer matches.
+        """
+        def is_bad(entry: ManifestEntry) -> bool:
+            try:
+                return file_digest(entry.path) != entry.sha256
+            except OSError:
+                return True
+
+        entries = self.entries()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            bad = list(pool.map(is_bad, entries))
+        return [entry for entry, mismatch in zip(entries, bad) if mismatch]
+
+
+def _same_version(entry: ManifestEntry, remote: RemoteFile) -> bool:
+    if entry.file_id != remote.file_id:
+        return False
+    if remote.md5_checksum is not None:
+        return entry.md5_checksum == remote.md5_checksum
+    return entry.modified_time == remote.modified_time
+
+
+def drive_credentials(
+    client_secrets: Path = DRIVE_CLIENT_SECRETS,
+    token_path: Path = DRIVE_TOKEN_PATH,
+):
+    """
+    Return google-auth credentials that may read Drive metadata.  The token
+    saved at `token_path` is reused (and refreshed) when there is one;
+    otherwise the OAuth client in `client_secrets` asks for consent in the
+    browser and the new token is saved.  Needs the gdrive extra.
+    """
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    token_path = Path(token_path)
+    credentials = None
+    if token_path.exists():
+        credentials = Credentials.from_authorized_user_file(str(token_path), DRIVE_METADATA_SCOPES)
+    if credentials is not None and credentials.valid:
+        return credentials
+    if credentials is not None and credentials.expired and credentials.refresh_token:
+        credentials.refresh(Request())
+    else:
+        flow = InstalledAppFlow.from_client_secrets_file(str(client_secrets), DRIVE_METADATA_SCOPES)
+        credentials = flow.run_local_server(port=0)
+    token_path.parent.mkdir(parents=True, exist_ok=True)
+    token_path.write_text(credentials.to_json())
+    return credentials
+
+
+class DriveFiles:
+    """
+    Looks asset names ("dir/file.wav") up under a Google Drive folder with
+    the Drive v3 API and returns their RemoteFile metadata, or None if there
+    is no such file.  `credentials` are google-auth credentials allowed to
+    read the folder; by default they come from `drive_credentials()`, the
+    first time a name is looked up.  Needs the gdrive extra; each thread
+    gets its own session.
+    """
+
+    def __init__(self, folder_id: str, credentials=None):
+        self.folder_id = folder_id
+        self._credentials = credentials
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            from google.auth.transport.requests import AuthorizedSession
+            with self._lock:
+                if self._credentials is None:
+                    self._credentials = drive_credentials()
+            session = self._local.session = AuthorizedSession(self._credentials)
+        return session
+
+    def __call__(self, name: str) -> Optional[RemoteFile]:
+        parent = self.folder_id
+        parts = name.split("/")
+        for i, part in enumerate(parts):
+            escaped = part.replace("\\", "\\\\").replace("'", "\\'")
+            query = f"name = '{escaped}' and '{parent}' in parents and trashed = false"
+            if i < len(parts) - 1:
+                query += " and mimeType = 'application/vnd.google-apps.folder'"
+            response = self._session().get(DRIVE_FILES_URL, params={
+                "q": query,
+                "fields": "files(id,modifiedTime,md5Checksum)",
+                "supportsAllDrives": "true",
+                "includeItemsFromAllDrives": "true",
+            })
+            response.raise_for_status()
+            files = response.json()["files"]
+            if not files:
+                return None
+            parent = files[0]["id"]
+        found = files[0]
+        return RemoteFile(found["id"], found.get("modifiedTime"), found.get("md5Checksum"))
+
+
+def drive_files(folder_id: str) -> Optional[DriveFiles]:
+    """
+    A DriveFiles for `folder_id` if an OAuth client has been set up at
+    DRIVE_CLIENT_SECRETS (or a token saved at DRIVE_TOKEN_PATH), else None,
+    in which case the manifest only tracks the local copies.
+    """
+    if not (DRIVE_CLIENT_SECRETS.exists() or DRIVE_TOKEN_PATH.exists()):
+        logger.info(
+            f"No {DRIVE_CLIENT_SECRETS.name} in {DRIVE_CLIENT_SECRETS.parent}; "
+            f"not recording Drive file ids in the asset manifest")
+        return None
+    return DriveFiles(folder_id)
+
+
+class ManifestAssetManager:
+    """
+    Front end for a pygmu2 AssetManager that answers from the manifest when
+    it can.  The wrapped manager (and with it any Google Drive connection) is
+    only created, via `asset_manager_factory`, for assets the manifest
+    doesn't cover, so fully cached runs make no remote calls at all.  Each
+    thread gets its own wrapped manager, since pygmu2's aren't thread-safe.
+
+    pygmu2's AssetManager doesn't report Drive metadata, so it comes from
+    `remote_files` (e.g. a DriveFiles), called with an asset name.  Without
+    it, entries record no file id and only the local copy is checked.  With
+    `check_remote`, every load also asks `remote_files` for the current
+    metadata and refetches assets that have changed on Drive; otherwise it is
+    only asked after a fetch, to record what was fetched.
+    """
+
+    def __init__(
+        self,
+        folder_id: str,
+        asset_manager_factory: Callable[[], object],
+        manifest: Optional[AssetManifest] = None,
+        remote_files: Optional[Callable[[str], Optional[RemoteFile]]] = None,
+        check_remote: bool = False,
+    ):
+        self.folder_id = folder_id
+        self._manifest = manifest if manifest is not None else AssetManifest.default()
+        self._asset_managers = PerThreadAssetManager(asset_manager_factory)
+        self._remote_files = remote_files
+        self.check_remote = check_remote and remote_files is not None
+
+    def key(self, name: str) -> str:
+        """What `name` is recorded under: names are only unique within a folder."""
+        return f"{self.folder_id}/{name}"
+
+    def asset_manager(self):
+        return self._asset_managers.asset_manager()
+
+    def cache_path(self) -> Path:
+        return Path(self.asset_manager().cache_path())
+
+    def load_asset(self, name: str) -> Path:
+        key = self.key(name)
+        remote = self._remote_files(name) if self.check_remote else None
+        path = self._manifest.lookup(key, remote)
+        if path is not None:
+            return path
+        path = Path(self.asset_manager().load_asset(name))
+        if remote is None and self._remote_files is not None:
+            remote = self._remote_files(name)
+        self._manifest.record(name, key, path, remote)
+        logger.info(f"Added {name} to asset manifest")
+        return path
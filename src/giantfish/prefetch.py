@@ -0,0 +1,144 @@
+"""Concurrent prefetching of remote assets into the local cache."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from pygmu2.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+ProgressCallback = Callable[[int, int, str], None]
+
+# Errors that another attempt won't fix, so they fail without retrying.
+PERMANENT_ERRORS = (
+    FileNotFoundError, IsADirectoryError, NotADirectoryError, PermissionError,
+    KeyError, TypeError, ValueError)
+
+
+class PrefetchError(Exception):
+    """Raised when one or more assets could not be fetched."""
+
+    def __init__(self, failures: dict[str, BaseException]):
+        self.failures = failures
+        names = ", ".join(sorted(failures))
+        super().__init__(f"failed to fetch {len(failures)} asset(s): {names}")
+
+
+class DirectoryAssetManager:
+    """
+    Stand-in for pygmu2's AssetManager that resolves asset names against a
+    local directory.  Useful for exercising prefetch and registry code
+    without Google Drive.
+    """
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+
+    def cache_path(self) -> Path:
+        return self.root
+
+    def load_asset(self, name: str) -> Path:
+        path = self.root / name
+        if not path.is_file():
+            raise FileNotFoundError(path)
+        return path
+
+    def list_remote_assets(self, spec: str) -> list[str]:
+        return sorted(str(p.relative_to(self.root)) for p in self.root.glob(spec))
+
+
+class PerThreadAssetManager:
+    """
+    Asset manager that gives every thread its own manager, created on first
+    use by `asset_manager_factory`.  pygmu2's AssetManager and its Google
+    Drive loader aren't thread-safe, so wrap their factory in this before
+    handing them to prefetch_assets().  Managers are created one at a time,
+    so only the first one goes through any interactive sign-in.
+    """
+
+    def __init__(self, asset_manager_factory: Callable[[], object]):
+        self._factory = asset_manager_factory
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def asset_manager(self):
+        asset_manager = getattr(self._local, "asset_manager", None)
+        if asset_manager is None:
+            with self._lock:
+                asset_manager = self._local.asset_manager = self._factory()
+        return asset_manager
+
+    def cache_path(self) -> Path:
+        return Path(self.asset_manager().cache_path())
+
+    def load_asset(self, name: str) -> Path:
+        return Path(self.asset_manager().load_asset(name))
+
+    def list_remote_assets(self, spec: str) -> list[str]:
+        return self.asset_manager().list_remote_assets(spec)
+
+
+def log_progress(completed: int, total: int, name: str) -> None:
+    logger.info(f"Fetched {completed}/{total}: {name}")
+
+
+def prefetch_assets(
+    asset_manager,
+    names: Iterable[str],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    retries: int = 2,
+    backoff: float = 0.5,
+    progress: Optional[ProgressCallback] = log_progress,
+) -> dict[str, Path]:
+    """
+    Resolve `names` with `asset_manager.load_asset()` using a pool of at most
+    `max_workers` threads, so a cold cache costs a few parallel round trips
+    instead of one per file.  Returns a dict of name to local path.
+
+    `asset_manager.load_asset()` is called from several threads at once, so
+    it must be thread-safe: use a ManifestAssetManager or wrap the factory of
+    a pygmu2 AssetManager in PerThreadAssetManager.
+
+    Each name is attempted up to `retries + 1` times, with exponential
+    backoff starting at `backoff` seconds; PERMANENT_ERRORS such as a
+    missing file fail at once.  `progress(completed, total, name)`
+    is called as each asset finishes.  If any asset still fails, the others
+    are allowed to finish and then PrefetchError is raised.
+    """
+    names = list(dict.fromkeys(names))
+    paths: dict[str, Path] = {}
+    failures: dict[str, BaseException] = {}
+    if not names:
+        return paths
+
+    def fetch(name: str) -> Path:
+        for attempt in range(retries + 1):
+            try:
+                return Path(asset_manager.load_asset(name))
+            except Exception as e:
+                if attempt == retries or isinstance(e, PERMANENT_ERRORS):
+                    raise
+                logger.warning(f"Fetching {name} failed ({e}), retrying")
+                time.sleep(backoff * (2 ** attempt))
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(names))) as pool:
+        futures = {pool.submit(fetch, name): name for name in names}
+        for completed, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            try:
+                paths[name] = future.result()
+            except Exception as e:
+                failures[name] = e
+            if progress is not None:
+                progress(completed, len(names), name)
+
+    if failures:
+        raise PrefetchError(failures)
+    return {name: paths[name] for name in names}
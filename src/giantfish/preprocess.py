@@ -0,0 +1,173 @@
+"""Declarative, incremental preprocessing of derived assets."""
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import pygmu2 as pg
+from pygmu2.logger import get_logger
+
+from giantfish.config import CACHE_DIR
+from giantfish.graph_hash import file_digest
+from giantfish.render import render_to_wav_file
+from giantfish.wavfile import MmapWavReaderPE
+
+logger = get_logger(__name__)
+
+STAMPS_PATH = CACHE_DIR / "preprocess_stamps.json"
+
+
+def highpass_4th_order(stream: pg.ProcessingElement, frequency: float) -> pg.ProcessingElement:
+    # Chain two 2nd order highpass filters together for sharper rolloff
+    filtered_stream = pg.BiquadPE(
+        stream,
+        frequency=frequency,
+        q=0.707,
+        mode=pg.BiquadMode.HIGHPASS)
+    filtered_stream = pg.BiquadPE(
+        filtered_stream,
+        frequency=frequency,
+        q=0.707,
+        mode=pg.BiquadMode.HIGHPASS)
+    return filtered_stream
+
+
+def time_warp(stream: pg.ProcessingElement, rate: float) -> pg.ProcessingElement:
+    return pg.TimeWarpPE(stream, rate)
+
+
+# Operations available to steps, by name.  Each takes the input stream plus
+# the step's params as keyword arguments and returns the processed stream.
+OPERATIONS: dict[str, Callable[..., pg.ProcessingElement]] = {
+    "highpass": highpass_4th_order,
+    "pitch": time_warp,
+}
+
+
+@dataclass
+class Step:
+    """Produce asset `output` by applying operation `op` to asset `input`."""
+    input: str
+    op: str
+    output: str
+    params: dict[str, Any] = field(default_factory=dict)
+
+
+def run_pipeline(
+    steps: list[Step],
+    asset_manager,
+    sample_rate: int,
+    jobs: Optional[int] = None,
+    force: bool = False,
+    stamps_path: Path = STAMPS_PATH,
+) -> list[Step]:
+    """
+    Bring every step's output up to date and return the steps that ran.
+
+    Inputs that are not produced by another step are fetched with
+    `asset_manager.load_asset()`; outputs are written to the asset manager's
+    cache directory, where later `load_asset()` calls will find them.
+
+    A step is skipped when its output exists and was produced from the same
+    input contents, operation, params and sample rate.  Steps whose inputs
+    are ready run concurrently in up to `jobs` worker processes, and a step
+    that consumes another step's output waits for it.
+    """
+    for step in steps:
+        if step.op not in OPERATIONS:
+            raise ValueError(f"{step.output}: unknown operation '{step.op}'")
+    producers = {step.output: step for step in steps}
+    if len(producers) != len(steps):
+        raise ValueError("two steps write the same output")
+
+    cache_dir = Path(asset_manager.cache_path())
+    stamps = _load_stamps(stamps_path)
+    pending = list(steps)
+    running: dict[Future, tuple[Step, str]] = {}
+    ran: list[Step] = []
+
+    # Workers only need file paths and parameters, so a fresh interpreter
+    # (rather than a fork of one holding Drive connections) is enough.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+        while pending or running:
+            unfinished = {s.output for s in pending}
+            unfinished.update(s.output for s, _ in running.values())
+            for step in [s for s in pending if s.input not in unfinished]:
+                pending.remove(step)
+                if step.input in producers:
+                    input_path = cache_dir / step.input
+                else:
+                    input_path = Path(asset_manager.load_asset(step.input))
+                output_path = cache_dir / step.output
+                stamp = _stamp(step, input_path, sample_rate)
+                if not force and output_path.exists() and stamps.get(step.output) == stamp:
+                    logger.info(f"{step.output} is up to date")
+                    continue
+                logger.info(f"Building {step.output} ({step.op} {step.params})")
+                future = pool.submit(
+                    _run_step, step.op, step.params, str(input_path),
+                    str(output_path), sample_rate)
+                running[future] = (step, stamp)
+
+            if not running:
+                if pending:
+                    names = ", ".join(step.output for step in pending)
+                    raise ValueError(f"steps form a cycle: {names}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step, stamp = running.pop(future)
+                future.result()
+                stamps[step.output] = stamp
+                _save_stamps(stamps_path, stamps)
+                ran.append(step)
+                logger.info(f"Wrote {step.output}")
+    return ran
+
+
+def _stamp(step: Step, input_path: Path, sample_rate: int) -> str:
+    description = {
+        "input": file_digest(input_path),
+        "op": step.op,
+        "params": step.params,
+        "sample_rate": sample_rate,
+    }
+    text = json.dumps(description, sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _load_stamps(path: Path) -> dict[str, str]:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_stamps(path: Path, stamps: dict[str, str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(stamps, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _run_step(op: str, params: dict[str, Any], input_path: str, output_path: str,
+              sample_rate: int) -> None:
+    pg.set_sample_rate(sample_rate)
+    stream = MmapWavReaderPE(input_path)
+    if stream.file_sample_rate != sample_rate:
+        logger.warning(
+            f"sample rate mismatch: file={stream.file_sample_rate}, "
+            f"system={sample_rate}, ignoring...")
+    processed = OPERATIONS[op](stream, **params)
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp.wav"
+    render_to_wav_file(processed, tmp_path, sample_rate)
+    os.replace(tmp_path, output_path)
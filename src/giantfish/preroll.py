@@ -0,0 +1,127 @@
+"""Estimate how much history a graph needs before a render window."""
+from __future__ import annotations
+
+import math
+from numbers import Real
+from typing import Callable, Optional
+
+import pygmu2 as pg
+from pygmu2.logger import get_logger
+
+from giantfish.control_rate import ControlRatePE
+
+logger = get_logger(__name__)
+
+# Used when a filter or dynamics element doesn't expose its time constants.
+DEFAULT_SETTLE_SECONDS = 1.0
+
+# Pure or self-synchronising pygmu2 elements: no history needed of their own.
+# Random sources restart wherever they are asked to, as they do in a full
+# render, so there is no history they could match anyway.
+_NO_HISTORY = {
+    "ConstantPE", "CropPE", "DelayPE", "GainPE", "MixPE", "PiecewisePE",
+    "RandomPE", "RandomSelectPE", "SequencePE", "SetExtentPE", "SinePE",
+    "SlicePE", "SpatialPE", "TimeWarpPE", "TransformPE", "WavReaderPE",
+}
+
+
+def _number(pe: pg.ProcessingElement, *names: str) -> Optional[float]:
+    """The first of `names` (or `_name`) on `pe` holding a plain number."""
+    for name in names:
+        for attr in (name, f"_{name}"):
+            value = getattr(pe, attr, None)
+            if isinstance(value, Real):
+                return float(value)
+    return None
+
+
+def _reverb_preroll(pe: pg.ProcessingElement, sample_rate: int) -> Optional[int]:
+    inputs = pe.inputs()
+    if len(inputs) < 2 or inputs[1].extent().duration is None:
+        return None
+    return inputs[1].extent().duration - 1
+
+
+def _biquad_preroll(pe: pg.ProcessingElement, sample_rate: int) -> int:
+    # A Q = 0.707 section rings down by ~120 dB in about 3.2 periods of its
+    # corner frequency.
+    frequency = _number(pe, "frequency")
+    if not frequency:
+        return math.ceil(DEFAULT_SETTLE_SECONDS * sample_rate)
+    return math.ceil(3.2 * sample_rate / frequency)
+
+
+def _compressor_preroll(pe: pg.ProcessingElement, sample_rate: int) -> int:
+    # The envelope follower forgets its past after ~7 release time constants.
+    release = _number(pe, "release", "release_time")
+    if release is None:
+        return math.ceil(DEFAULT_SETTLE_SECONDS * sample_rate)
+    lookahead = _number(pe, "lookahead") or 0.0
+    return math.ceil((7.0 * release + lookahead) * sample_rate)
+
+
+# Pre-roll rules for stateful pygmu2 elements, by class name.  Each returns
+# the samples of history the element itself needs, or None for "all of it".
+PREROLL_RULES: dict[str, Callable[[pg.ProcessingElement, int], Optional[int]]] = {
+    "ReverbPE": _reverb_preroll,
+    "BiquadPE": _biquad_preroll,
+    "CompressorPE": _compressor_preroll,
+}
+
+
+def estimate_preroll(graph: pg.ProcessingElement, sample_rate: int) -> Optional[int]:
+    """
+    Return how many samples before a render window `graph` must be rendered
+    from so that every stateful element has settled into the same state as
+    in a render that started at the beginning, or None if that can't be
+    bounded (the graph must then be rendered from its start).
+
+    Each element's own need comes from its `preroll_samples()` method if it
+    has one (giantfish PEs), else from PREROLL_RULES, else is zero for pure
+    elements.  Needs add up along each path through the graph; the answer is
+    the largest total.  A LoopPE over stateful material needs a full period
+    on top, and a ControlRatePE scales its modulator's needs by its period.
+    """
+    memo: dict[int, Optional[int]] = {}
+    unknown: set[str] = set()
+
+    def own(pe: pg.ProcessingElement) -> Optional[int]:
+        method = getattr(pe, "preroll_samples", None)
+        if method is not None:
+            return method()
+        rule = PREROLL_RULES.get(type(pe).__name__)
+        if rule is not None:
+            return rule(pe, sample_rate)
+        if type(pe).__name__ in _NO_HISTORY or pe.is_pure():
+            return 0
+        unknown.add(type(pe).__name__)
+        return None
+
+    def visit(pe: pg.ProcessingElement) -> Optional[int]:
+        key = id(pe)
+        if key in memo:
+            return memo[key]
+        memo[key] = None  # guards against cycles
+        if isinstance(pe, ControlRatePE):
+            inner = visit(pe.mod)
+            need = None if inner is None else (inner + 1) * pe.period
+        else:
+            need = own(pe)
+            upstream = [visit(child) for child in pe.inputs()]
+            if need is not None and None not in upstream:
+                deepest = max(upstream, default=0)
+                if type(pe).__name__ == "LoopPE" and deepest > 0:
+                    period = pe.inputs()[0].extent().duration
+                    deepest = None if period is None else deepest + period
+                need = None if deepest is None else need + deepest
+            else:
+                need = None
+        memo[key] = need
+        return need
+
+    need = visit(graph)
+    if unknown:
+        logger.warning(
+            f"no pre-roll rule for {', '.join(sorted(unknown))}; "
+            "rendering from the start")
+    return need
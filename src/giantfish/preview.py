@@ -0,0 +1,305 @@
+"""Real-time preview that renders ahead of the audio callback."""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Optional, Protocol
+
+import numpy as np
+import pygmu2 as pg
+from pygmu2.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_AHEAD_SECONDS = 4.0
+DEFAULT_BLOCK_SIZE = 1024
+# Blocks rendered before the sink starts
+DEFAULT_PREFILL_BLOCKS = 4
+
+# Fills a (frames, channels) output buffer; returns False once playback is over.
+AudioCallback = Callable[[np.ndarray], bool]
+
+
+class RingBuffer:
+    """
+    Single-producer, single-consumer ring of (frames, channels) float32
+    audio.  The producer only advances `write_count` and the consumer only
+    advances `read_count`; both are plain ints, so neither side takes a
+    lock.  `flush()` (producer side) marks everything written so far as
+    stale, and the consumer skips it on its next read.
+    """
+
+    def __init__(self, capacity: int, channels: int):
+        self.capacity = capacity
+        self._data = np.zeros((capacity, channels), dtype=np.float32)
+        self.write_count = 0
+        self.read_count = 0
+        self.flush_count = 0
+
+    def available(self) -> int:
+        """Frames the consumer can read."""
+        return self.write_count - max(self.read_count, self.flush_count)
+
+    def free(self) -> int:
+        """Frames the producer can write."""
+        return self.capacity - self.available()
+
+    def flush(self) -> None:
+        self.flush_count = self.write_count
+
+    def write(self, data: np.ndarray) -> int:
+        """Append as much of `data` as fits; return the frames written."""
+        n = min(len(data), self.free())
+        pos = self.write_count % self.capacity
+        first = min(n, self.capacity - pos)
+        self._data[pos:pos + first] = data[:first]
+        self._data[:n - first] = data[first:n]
+        self.write_count += n
+        return n
+
+    def read(self, out: np.ndarray) -> int:
+        """Copy up to len(out) frames into `out`; return the frames read."""
+        if self.read_count < self.flush_count:
+            self.read_count = self.flush_count
+        n = min(len(out), self.write_count - self.read_count)
+        pos = self.read_count % self.capacity
+        first = min(n, self.capacity - pos)
+        out[:first] = self._data[pos:pos + first]
+        out[first:n] = self._data[:n - first]
+        self.read_count += n
+        return n
+
+
+class AudioSink(Protocol):
+    def start(self, callback: AudioCallback, channels: int, sample_rate: int,
+              block_size: int) -> None: ...
+
+    def stop(self) -> None: ...
+
+
+class NullAudioSink:
+    """
+    A sink with no audio device: a thread calls the callback once per block
+    on a simulated clock, `speed` times faster than real time.  With
+    `record`, the blocks played are kept in `blocks`, for tests.
+    """
+
+    def __init__(self, speed: float = 1.0, record: bool = False):
+        self.speed = speed
+        self.record = record
+        self.blocks: list[np.ndarray] = []
+        self.callbacks = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self, callback: AudioCallback, channels: int, sample_rate: int,
+              block_size: int) -> None:
+        self._stop.clear()
+        period = block_size / sample_rate / self.speed
+
+        def run() -> None:
+            next_tick = time.perf_counter()
+            while not self._stop.is_set():
+                out = np.zeros((block_size, channels), dtype=np.float32)
+                more = callback(out)
+                self.callbacks += 1
+                if self.record:
+                    self.blocks.append(out)
+                if not more:
+                    return
+                next_tick += period
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    self._stop.wait(delay)
+
+        self._thread = threading.Thread(target=run, name="null-audio-sink", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def output(self) -> np.ndarray:
+        """Everything recorded so far as one (frames, channels) array."""
+        return np.concatenate(self.blocks) if self.blocks else np.zeros((0, 0), np.float32)
+
+
+class SoundDeviceSink:
+    """Plays through the default output device with `sounddevice`."""
+
+    def __init__(self, device: Optional[int | str] = None):
+        self.device = device
+        self._stream = None
+
+    def start(self, callback: AudioCallback, channels: int, sample_rate: int,
+              block_size: int) -> None:
+        try:
+            import sounddevice
+        except ImportError as e:
+            raise ImportError(
+                "audio preview needs sounddevice (a pygmu2 dependency): "
+                "pip install sounddevice") from e
+
+        def device_callback(outdata, frames, time_info, status) -> None:
+            if not callback(outdata):
+                raise sounddevice.CallbackStop
+
+        self._stream = sounddevice.OutputStream(
+            samplerate=sample_rate, blocksize=block_size, channels=channels,
+            dtype="float32", device=self.device, callback=device_callback)
+        self._stream.start()
+
+    def stop(self) -> None:
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class PreviewRenderer:
+    """
+    Play `source` in real time with `ahead_seconds` of look-ahead.
+
+    A worker thread renders `source` block by block into a RingBuffer while
+    the sink's audio callback only copies out of it, so a slow block (a long
+    ReverbPE or CompressorPE warming up) is absorbed by the buffer instead
+    of underrunning the device.  `seek()` flushes the buffer and the worker
+    refills it from the new position; playback picks it up on the next
+    callback.  Underruns (callbacks the buffer couldn't fill) are counted.
+
+    Playback starts once `prefill_blocks` blocks are buffered, rather than
+    the whole `ahead_seconds`; the worker keeps filling the rest while the
+    sink plays.
+    """
+
+    def __init__(
+        self,
+        source: pg.ProcessingElement,
+        sample_rate: int,
+        sink: Optional[AudioSink] = None,
+        ahead_seconds: float = DEFAULT_AHEAD_SECONDS,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        prefill_blocks: int = DEFAULT_PREFILL_BLOCKS,
+    ):
+        self.source = source
+        self.sample_rate = sample_rate
+        self.sink = sink if sink is not None else SoundDeviceSink()
+        self.block_size = block_size
+        extent = source.extent()
+        self.start_position = 0 if extent.start is None else extent.start
+        self.end_position = extent.end
+        self.channels = source.channel_count() or 1
+        capacity = max(2 * block_size, int(ahead_seconds * sample_rate))
+        self._ring = RingBuffer(capacity, self.channels)
+        self.prefill = min(prefill_blocks * block_size, capacity)
+        self.underruns = 0
+        # Ring frame index where the current segment starts, and its position
+        self._segment = (0, self.start_position)
+        self._seek_to: Optional[int] = None
+        self._rendered_to = self.start_position
+        self._done = False
+        self._running = False
+        self._error: Optional[BaseException] = None
+        self._finished = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    @property
+    def position(self) -> int:
+        """The sample position last handed to the sink."""
+        index, position = self._segment
+        return position + max(0, self._ring.read_count - index)
+
+    def seek(self, position: int) -> None:
+        """Continue playback from `position` as soon as it has been rendered."""
+        self._seek_to = position
+        self._finished.clear()
+
+    def start(self) -> None:
+        """Buffer `prefill_blocks` blocks, then start the sink."""
+        if self._running:
+            return
+        self._running = True
+        self._finished.clear()
+        self._worker = threading.Thread(target=self._render_ahead, name="preview-render", daemon=True)
+        self._worker.start()
+        # Give the device a few blocks' head start, not the whole buffer
+        while (self._running and not self._done and self._error is None
+               and self._ring.available() < self.prefill):
+            time.sleep(0.001)
+        self.sink.start(self._callback, self.channels, self.sample_rate, self.block_size)
+
+    def stop(self) -> None:
+        self._running = False
+        self.sink.stop()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+        self._finished.set()
+        if self._error is not None:
+            raise self._error
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for playback to reach the end; return False on timeout."""
+        return self._finished.wait(timeout)
+
+    def play(self) -> None:
+        """Play from the current position to the end of `source`."""
+        self.start()
+        try:
+            while not self.wait(0.1):
+                if self._error is not None:
+                    break
+        finally:
+            self.stop()
+
+    def _callback(self, out: np.ndarray) -> bool:
+        n = self._ring.read(out)
+        if n < len(out):
+            out[n:] = 0.0
+            if self._done and self._seek_to is None and self._ring.available() == 0:
+                self._finished.set()
+                return False
+            self.underruns += 1
+        return True
+
+    def _render_ahead(self) -> None:
+        ring = self._ring
+        idle = self.block_size / self.sample_rate / 4
+        renderer = pg.NullRenderer(sample_rate=self.sample_rate)
+        renderer.set_source(self.source)
+        try:
+            with renderer:
+                renderer.start()
+                while self._running:
+                    seek_to = self._seek_to
+                    if seek_to is not None:
+                        self._seek_to = None
+                        ring.flush()
+                        self._segment = (ring.write_count, seek_to)
+                        self._rendered_to = seek_to
+                        self._done = False
+                    end = self.end_position
+                    if end is not None and self._rendered_to >= end:
+                        self._done = True
+                    if self._done or ring.free() < self.block_size:
+                        time.sleep(idle)
+                        continue
+                    pos = self._rendered_to
+                    n = self.block_size if end is None else min(self.block_size, end - pos)
+                    ring.write(self.source.render(pos, n).data)
+                    self._rendered_to = pos + n
+        except BaseException as e:
+            self._error = e
+            self._done = True
+            logger.error(f"Preview render failed: {e}")
+
+
+def preview(
+    source: pg.ProcessingElement,
+    sample_rate: int,
+    ahead_seconds: float = DEFAULT_AHEAD_SECONDS,
+) -> None:
+    """Play the extent of `source` on the default output device."""
+    PreviewRenderer(source, sample_rate, ahead_seconds=ahead_seconds).play()
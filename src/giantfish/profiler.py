@@ -0,0 +1,158 @@
+"""Per-node render profiling of PE graphs."""
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Mapping, Optional
+
+import pygmu2 as pg
+
+from giantfish.checkpoint import graph_nodes
+
+
+@dataclass
+class NodeStats:
+    label: str
+    class_name: str
+    calls: int = 0
+    samples: int = 0
+    inclusive: float = 0.0
+    exclusive: float = 0.0
+    bytes: int = 0
+
+
+def variable_names(namespace: Mapping[str, Any]) -> dict[int, str]:
+    """
+    Map id(pe) to the variable name(s) bound to each PE in `namespace`
+    (typically a script's `globals()`), aliases joined with '/'.
+    """
+    names: dict[int, list[str]] = {}
+    for name, value in namespace.items():
+        if isinstance(value, pg.ProcessingElement) and not name.startswith("_"):
+            names.setdefault(id(value), []).append(name)
+    return {key: "/".join(aliases) for key, aliases in names.items()}
+
+
+class GraphProfiler:
+    """
+    Times every render call of every node reachable from `graphs`.
+
+    While the profiler is active (as a context manager, or between
+    `install()` and `uninstall()`), each node's `render` is shadowed by an
+    instance attribute that records calls, samples, inclusive time, exclusive
+    time (inclusive minus time spent in its inputs' renders) and the bytes of
+    the output buffers it returned.  Exclusive time is also accumulated per
+    call stack, for flame graphs.
+
+    Nodes are labelled with their names from `names` (see variable_names()),
+    else as ClassName#n.
+    """
+
+    def __init__(self, *graphs: pg.ProcessingElement, names: Optional[Mapping[int, str]] = None):
+        names = names or {}
+        self._nodes: list[pg.ProcessingElement] = []
+        seen: set[int] = set()
+        for graph in graphs:
+            for pe in graph_nodes(graph):
+                if id(pe) not in seen:
+                    seen.add(id(pe))
+                    self._nodes.append(pe)
+        self.stats = [
+            NodeStats(names.get(id(pe), f"{type(pe).__name__}#{index}"), type(pe).__name__)
+            for index, pe in enumerate(self._nodes)]
+        # Exclusive seconds per call stack of node indices, root first.
+        self.stacks: dict[tuple[int, ...], float] = {}
+        # Frames of the renders in progress: [node index, time in children]
+        self._frames: list[list] = []
+        self._installed = False
+
+    def __enter__(self) -> GraphProfiler:
+        self.install()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.uninstall()
+
+    def install(self) -> None:
+        if self._installed:
+            return
+        for index, pe in enumerate(self._nodes):
+            pe.render = self._wrap(index, pe.render)
+        self._installed = True
+
+    def uninstall(self) -> None:
+        if not self._installed:
+            return
+        for pe in self._nodes:
+            del pe.render
+        self._installed = False
+
+    def _wrap(self, index: int, render):
+        stats = self.stats[index]
+        frames = self._frames
+
+        def profiled_render(start: int, duration: int) -> pg.Snippet:
+            frame = [index, 0.0]
+            frames.append(frame)
+            t0 = time.perf_counter()
+            try:
+                snippet = render(start, duration)
+            finally:
+                elapsed = time.perf_counter() - t0
+                path = tuple(f[0] for f in frames)
+                frames.pop()
+                exclusive = elapsed - frame[1]
+                if frames:
+                    frames[-1][1] += elapsed
+                stats.calls += 1
+                stats.samples += duration
+                stats.inclusive += elapsed
+                stats.exclusive += exclusive
+                self.stacks[path] = self.stacks.get(path, 0.0) + exclusive
+            stats.bytes += snippet.data.nbytes
+            return snippet
+
+        return profiled_render
+
+    def reset(self) -> None:
+        for stats in self.stats:
+            stats.calls = stats.samples = stats.bytes = 0
+            stats.inclusive = stats.exclusive = 0.0
+        self.stacks.clear()
+
+    def write_collapsed(self, path: str | os.PathLike) -> Path:
+        """
+        Write exclusive time per call stack in the collapsed-stack format
+        ("root;child;leaf microseconds" per line), which speedscope and
+        flamegraph.pl open directly.
+        """
+        path = Path(path)
+        lines = []
+        for stack, seconds in sorted(self.stacks.items()):
+            micros = int(round(seconds * 1e6))
+            if micros > 0:
+                labels = (self.stats[i].label.replace(";", ",") for i in stack)
+                lines.append(f"{';'.join(labels)} {micros}\n")
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            f.writelines(lines)
+        os.replace(tmp_path, path)
+        return path
+
+    def table(self, top: int = 20) -> str:
+        """The `top` nodes by exclusive time, as a text table."""
+        total = sum(stats.exclusive for stats in self.stats) or 1.0
+        ranked = sorted(self.stats, key=lambda stats: stats.exclusive, reverse=True)
+        lines = [
+            f"{'node':<32s} {'class':<24s} {'calls':>8s} {'incl s':>9s} "
+            f"{'excl s':>9s} {'excl %':>7s} {'MB out':>9s}"]
+        for stats in ranked[:top]:
+            if stats.calls == 0:
+                break
+            lines.append(
+                f"{stats.label[:32]:<32s} {stats.class_name[:24]:<24s} {stats.calls:8d} "
+                f"{stats.inclusive:9.3f} {stats.exclusive:9.3f} "
+                f"{100.0 * stats.exclusive / total:6.1f}% {stats.bytes / (1 << 20):9.1f}")
+        return "\n".join(lines)
@@ -0,0 +1,81 @@
+"""Lazily populated, dict-style registries of named assets."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Callable, Generic, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LazyRegistry(Mapping[str, T], Generic[T]):
+    """
+    A read-only mapping whose entries are built on first access.
+
+    `register(name, factory)` records how to build an entry without building
+    it.  Looking the name up calls the factory once and caches the result, so
+    only assets a script actually uses are fetched, opened or decoded.
+    Iterating, `len()` and `in` never build entries.  `touched()` lists the
+    entries that have been built, in the order they were first accessed.
+
+    `prefetcher`, if given, is called by `prefetch()` with a list of entry
+    names whose underlying files should be fetched ahead of first access.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        prefetcher: Optional[Callable[[list[str]], None]] = None,
+    ):
+        self.name = name
+        self._prefetcher = prefetcher
+        self._factories: dict[str, Callable[[], T]] = {}
+        self._entries: dict[str, T] = {}
+
+    def register(self, key: str, factory: Callable[[], T]) -> None:
+        if key in self._entries:
+            raise KeyError(f"{self.name}: '{key}' is already loaded")
+        self._factories[key] = factory
+
+    def __getitem__(self, key: str) -> T:
+        try:
+            return self._entries[key]
+        except KeyError:
+            pass
+        factory = self._factories[key]
+        entry = self._entries[key] = factory()
+        return entry
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._factories
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
+
+    def __len__(self) -> int:
+        return len(self._factories)
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self._entries
+
+    def touched(self) -> list[str]:
+        return list(self._entries)
+
+    def prefetch(self, keys: Optional[Iterable[str]] = None) -> None:
+        """
+        Fetch the files behind `keys` (default: every entry not yet loaded)
+        without building the entries themselves.
+        """
+        if self._prefetcher is None:
+            return
+        if keys is None:
+            keys = (key for key in self._factories if key not in self._entries)
+        keys = list(keys)
+        for key in keys:
+            if key not in self._factories:
+                raise KeyError(key)
+        if keys:
+            self._prefetcher(keys)
+
+    def __repr__(self) -> str:
+        return (f"<LazyRegistry {self.name}: "
+                f"{len(self._entries)}/{len(self._factories)} loaded>")
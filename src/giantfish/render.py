@@ -0,0 +1,115 @@
+"""Offline rendering helpers."""
+from __future__ import annotations
+
+import os
+from typing import Optional
+
+import numpy as np
+import pygmu2 as pg
+from pygmu2.logger import get_logger
+
+from giantfish.preroll import estimate_preroll
+from giantfish.wav_writer import ThreadedWavWriter
+
+logger = get_logger(__name__)
+
+DEFAULT_BLOCK_SIZE = 4096
+
+
+def render_to_array(
+    source: pg.ProcessingElement,
+    start: int,
+    duration: int,
+    sample_rate: int,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> np.ndarray:
+    """
+    Render `duration` samples of `source` starting at `start` and return them
+    as a (frames, channels) float32 array.  Blocks are pulled contiguously so
+    stateful elements (filters, compressors, reverbs) see an unbroken stream.
+    Only the part of the window inside the source's extent is rendered; the
+    rest is silent by definition and left as zeros.
+    """
+    extent = source.extent()
+    lo = start if extent.start is None else min(max(start, extent.start), start + duration)
+    hi = start + duration if extent.end is None else max(min(start + duration, extent.end), lo)
+    out = None
+    if lo < hi:
+        renderer = pg.NullRenderer(sample_rate=sample_rate)
+        renderer.set_source(source)
+        with renderer:
+            renderer.start()
+            for offset in range(lo - start, hi - start, block_size):
+                n = min(block_size, hi - start - offset)
+                data = source.render(start + offset, n).data
+                if out is None:
+                    out = np.zeros((duration, data.shape[1]), dtype=np.float32)
+                out[offset:offset + n] = data
+    if out is None:
+        out = np.zeros((duration, source.channel_count() or 1), dtype=np.float32)
+    return out
+
+
+def render_to_wav_file(
+    source: pg.ProcessingElement,
+    path: str | os.PathLike,
+    sample_rate: int,
+    format: str = "float32",
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> None:
+    """
+    Render the full (finite) extent of `source` to a WAV file at `path`, in
+    `format` (see giantfish.wav_writer.FORMATS).  Blocks are written by a
+    background thread while the next ones render.
+    """
+    extent = source.extent()
+    if extent.start is None or extent.end is None:
+        raise ValueError(f"{source} must have a finite extent to render to a file")
+    frames = extent.end - extent.start
+    writer = None
+    renderer = pg.NullRenderer(sample_rate=sample_rate)
+    renderer.set_source(source)
+    try:
+        with renderer:
+            renderer.start()
+            for pos in range(extent.start, extent.end, block_size):
+                data = source.render(pos, min(block_size, extent.end - pos)).data
+                if writer is None:
+                    writer = ThreadedWavWriter(
+                        path, data.shape[1], sample_rate, frames=frames, format=format)
+                writer.write(data)
+        if writer is None:
+            writer = ThreadedWavWriter(
+                path, source.channel_count() or 1, sample_rate, frames=0, format=format)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def render(
+    graph: pg.ProcessingElement,
+    start: int,
+    end: int,
+    sample_rate: int,
+    preroll: Optional[int] = None,
+    origin: int = 0,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+) -> np.ndarray:
+    """
+    Render [start, end) of `graph` so that it matches the same window of a
+    full render, without rendering everything before it.
+
+    Rendering begins `preroll` samples early (default: estimated from the
+    graph, see giantfish.preroll) so that reverb tails, filters and
+    compressors have settled, but never before the graph's extent starts or,
+    for graphs without a start, before `origin`, where a full render begins.
+    """
+    if preroll is None:
+        preroll = estimate_preroll(graph, sample_rate)
+    floor = graph.extent().start
+    floor = origin if floor is None else floor
+    lo = floor if preroll is None else max(start - preroll, floor)
+    lo = min(lo, start)
+    if lo < start:
+        logger.info(f"Rendering {start - lo} samples of pre-roll")
+    return render_to_array(graph, lo, end - lo, sample_rate, block_size)[start - lo:]
@@ -0,0 +1,55 @@
+"""Cache of source files resampled to the session sample rate."""
+from __future__ import annotations
+
+import math
+import os
+from pathlib import Path
+from typing import Optional
+
+from pygmu2.logger import get_logger
+from scipy.signal import resample_poly
+
+from giantfish.config import CACHE_DIR
+from giantfish.graph_hash import file_digest
+from giantfish.wavfile import MmapWavReaderPE, read_wav_info, write_wav
+
+logger = get_logger(__name__)
+
+RESAMPLE_CACHE_DIR = CACHE_DIR / "resampled"
+
+# Kaiser window beta for the polyphase anti-aliasing filter; 8.6 gives
+# roughly 90 dB of stopband attenuation.
+KAISER_BETA = 8.6
+
+
+def resampled_path(
+    path: str | os.PathLike,
+    sample_rate: int,
+    root: Optional[Path] = None,
+) -> Path:
+    """
+    Return the path of a WAV file with the contents of `path` at
+    `sample_rate`.  Files already at that rate are returned unchanged.
+    Others are resampled once with a polyphase filter and stored as 32-bit
+    float WAVs under `root` (default CACHE_DIR/resampled), keyed by the
+    source file's hash and the rate pair.
+    """
+    info = read_wav_info(path)
+    if info.sample_rate == sample_rate:
+        return Path(path)
+    root = Path(root) if root is not None else RESAMPLE_CACHE_DIR
+    out_path = root / f"{file_digest(path)}_{info.sample_rate}_{sample_rate}.wav"
+    if out_path.exists():
+        return out_path
+
+    logger.info(f"Resampling {path} from {info.sample_rate} to {sample_rate} Hz")
+    data = MmapWavReaderPE(path).render(0, info.frames).data
+    g = math.gcd(sample_rate, info.sample_rate)
+    resampled = resample_poly(
+        data, sample_rate // g, info.sample_rate // g, axis=0,
+        window=("kaiser", KAISER_BETA))
+    root.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(f"{out_path.stem}.{os.getpid()}.tmp")
+    write_wav(tmp_path, resampled, sample_rate)
+    os.replace(tmp_path, out_path)
+    return out_path
@@ -0,0 +1,479 @@
+"""
+The graph of scripts/score.py, built from any source of its assets.
+
+The Worlds Shortest Romance Novel, a poem by Zachary Smith, set to music of
+sorts.  BPM = 40.
+
+B   Event
+0   foghorn_amp ramp in for 8
+6   snores_amp ramp in for 12
+12  bubbles_amp ramp in for 12
+12  whalesong_amp ramp in for 12
+20  drum / chord ostinato starts (0, 2, 4, rest)
+34  "my half brother"
+
+    crowd_amp
+    crowd_wet_mix
+    speech_wet_mix
+"""
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Mapping, Optional, Protocol
+
+import pygmu2 as pg
+from pygmu2.logger import get_logger
+
+from giantfish.automation import AutomatedGainPE
+from giantfish.aux_bus import AuxBuses
+from giantfish.config import ASSETS_DIR
+from giantfish.control_rate import ControlRatePE
+from giantfish.convolution_pe import PartitionedConvolutionPE
+from giantfish.freeze import FreezePE
+from giantfish.loop_cache import MaterializedLoopPE
+from giantfish.panner import ConstantPowerPanPE
+from giantfish.preprocess import highpass_4th_order
+from giantfish.profiler import variable_names
+from giantfish.sampler import SampleEvent, SamplerPE, load_sample_buffers
+from giantfish.sparse_mix import SparseMixPE
+
+logger = get_logger(__name__)
+
+BEATS_PER_MINUTE = 40
+SECONDS_PER_BEAT = 60.0 / BEATS_PER_MINUTE
+SCORE_BEATS = 115
+
+# Seeds the strum timings of the plings
+SEED = 20260210
+
+# pan uwing a random walk.  The walk moves slowly, so it runs at control rate
+# (one step per WHALESONG_PAN_PERIOD samples) and the pan gains are computed
+# per step and interpolated.  The walk's spread grows with the square root of
+# the number of steps, so taking 1/WHALESONG_PAN_PERIOD as many steps needs
+# sqrt(WHALESONG_PAN_PERIOD) times the per-sample slew to wander as far.
+WHALESONG_PAN_PERIOD = 64
+
+PLING_STACKS = [
+    (53, 58, 66, 73),  # good
+    (47, 54, 62, 67),  # okay
+    (53, 58, 66, 74),  # okay
+    (47, 52, 55, 63),  # okay
+    (47, 53, 58, 63),  # good
+    (53, 61, 66, 72),  # good
+    # (49, 55, 63, 68),  # good
+    (49, 55, 63, 74),  # good
+
+    (52, 60, 63, 71),  # good
+    (47, 55, 57, 73),  # too sweet
+    (50, 57, 64, 70),  # okay
+    (49, 55, 60, 66),  # okay
+    (46, 53, 55, 63),  # tonal
+]
+
+# The spoken phrases, each read by voices n1, r1 and n2, and the beats of
+# silence after each one.
+VOICE_PHRASES = [
+    ("my half brother", 1.0),
+    ("his house is", 1.0),
+    ("most days", 0.0),
+    ("tethered only by", 1.0),
+    ("at night, far off", 1.0),
+    ("once a fish swam", 1.0),
+    ("once his breathing", 1.0),
+    ("he put something", 1.0),
+    ("here, hold this", 1.0),
+    ("a while or maybe", 1.0),
+    ("we were standing", 1.0),
+    ("this is the skull", 1.0),
+    ("if you put it up", 0.0),
+    ("you can hear", 1.5),
+    ("to be born", 0.0),
+]
+
+# The voices that read each phrase, panned left, center and right
+VOICES = ("n1", "r1", "n2")
+
+WHALESONG_SLICES = [f'jasper{i}_0_3' for i in range(1, 7)]
+
+DRUM_SLICES = ["taiko1", "taiko2", "taiko3", "taiko6", "taiko7"]
+
+
+class ScoreAssets(Protocol):
+    """Where build_score() gets its slices, impulse responses and uke notes."""
+
+    def slice(self, name: str) -> pg.ProcessingElement: ...
+
+    def ir(self, name: str) -> pg.ProcessingElement: ...
+
+    def uke_note(self, name: str) -> pg.ProcessingElement: ...
+
+
+class RegistryAssets:
+    """
+    ScoreAssets backed by the named asset registries of
+    scripts/named_assets.py.  IRs the registry doesn't name are read from
+    ASSETS_DIR/impulses/<name>.wav.
+    """
+
+    def __init__(
+        self,
+        slices: Mapping[str, pg.ProcessingElement],
+        irs: Mapping[str, pg.ProcessingElement],
+        uke_notes: Mapping[str, pg.ProcessingElement],
+    ):
+        self._slices = slices
+        self._irs = irs
+        self._uke_notes = uke_notes
+
+    def slice(self, name: str) -> pg.ProcessingElement:
+        return self._slices[name]
+
+    def ir(self, name: str) -> pg.ProcessingElement:
+        if name in self._irs:
+            return self._irs[name]
+        return pg.WavReaderPE(str(ASSETS_DIR / "impulses" / f"{name}.wav"))
+
+    def uke_note(self, name: str) -> pg.ProcessingElement:
+        return self._uke_notes[name]
+
+
+@dataclass
+class ScoreGraph:
+    """The tracks of the score, and names for their nodes (see variable_names())."""
+    tracks: dict[str, pg.ProcessingElement]
+    node_names: dict[int, str]
+
+
+def beats_to_samples(beats: float, sample_rate: int) -> int:
+    return int(round(beats * SECONDS_PER_BEAT * sample_rate))
+
+
+def samples_to_beats(samples: int, sample_rate: int) -> float:
+    return float(samples) / sample_rate / SECONDS_PER_BEAT
+
+
+def uke_note_name(pitch: int) -> str:
+    return f'uke_{pitch:02d}'
+
+
+def uke_note_names(stacks: Iterable[Iterable[int]] = PLING_STACKS) -> list[str]:
+    """The uke notes the chord stacks play, e.g. to prefetch them."""
+    return list(dict.fromkeys(uke_note_name(pitch) for stack in stacks for pitch in stack))
+
+
+def slice_names() -> list[str]:
+    """The slices build_score() reads, e.g. to prefetch them."""
+    return [
+        *WHALESONG_SLICES,
+        *(f"{voice} {phrase}" for phrase, _ in VOICE_PHRASES for voice in VOICES),
+        'bubbles_0_125',
+        'foghorns',
+        'snores',
+        *DRUM_SLICES,
+        'crowd',
+    ]
+
+
+def make_whalesong(assets: ScoreAssets, sample_rate: int) -> pg.ProcessingElement:
+    delay = 0
+    segments = []
+    for name in WHALESONG_SLICES:
+        pe = assets.slice(name)
+        segments.append(pg.DelayPE(pe, delay))
+        # 3 beats of silence before next
+        delay += pe.extent().duration + beats_to_samples(3, sample_rate)
+
+    # keep the 3 beats of silence
+    return pg.SetExtentPE(SparseMixPE(*segments), 0, delay)
+
+
+def make_randomized_start_times(
+    n: int,
+    max_start_time: float = 1.0,
+    rng: Optional[random.Random] = None,
+) -> list[float]:
+    """
+    Return a list of N floats, representing the start time of each of N notes.
+    The first start time is always 0, the last start time is always less than
+    or equal to max_start_time
+    """
+    rng = rng if rng is not None else random.Random()
+    start_times = [0.0]
+    max_delta = max_start_time / float(n)
+    for _ in range(n-1):
+        start_times.append(start_times[-1] + (rng.random() * max_delta))
+
+    logger.debug(f'Start times = {start_times}')
+    return start_times
+
+
+def generate_stacked_chords(
+    assets: ScoreAssets,
+    stacks: Iterable[Iterable[int]],
+    sample_rate: int,
+    rng: Optional[random.Random] = None,
+) -> SamplerPE:
+    """
+    The chord stacks, 14 beats apart, each strummed over 2 beats.  One flat
+    event list is played by a single sampler, rather than a SequencePE of
+    SequencePEs with a node per note.
+    """
+    events = []
+    start = 0
+    for stack in stacks:
+        stack = list(stack)
+        chord_start = beats_to_samples(start, sample_rate)
+        start_times = make_randomized_start_times(len(stack), max_start_time=2.0, rng=rng)
+        events.extend(
+            SampleEvent(uke_note_name(pitch), chord_start + beats_to_samples(t, sample_rate))
+            for pitch, t in zip(stack, start_times))
+        start += 14
+    names = list(dict.fromkeys(event.name for event in events))
+    samples = load_sample_buffers({name: assets.uke_note(name) for name in names}, names)
+    return SamplerPE(events, samples)
+
+
+def make_voices(assets: ScoreAssets, sample_rate: int) -> pg.ProcessingElement:
+    # Voices n1, r1 and n2 read each phrase together, panned left, center
+    # and right; each phrase starts once the longest reading of the last
+    # one has finished.
+    delay = 0
+    segments = {voice: [] for voice in VOICES}
+    for phrase, gap in VOICE_PHRASES:
+        logger.info(f"{phrase} ({samples_to_beats(delay, sample_rate):0.2f} beats)")
+        duration = 0
+        for voice, voice_segments in segments.items():
+            pe = assets.slice(f"{voice} {phrase}")
+            voice_segments.append(pg.DelayPE(pe, delay))
+            duration = max(duration, pe.extent().duration)
+        delay += duration + beats_to_samples(gap, sample_rate)
+
+    v1_compressed = pg.CompressorPE(SparseMixPE(*segments["n1"]))
+    v2_compressed = pg.CompressorPE(SparseMixPE(*segments["r1"]))
+    v3_compressed = pg.CompressorPE(SparseMixPE(*segments["n2"]))
+    v3_attenuated = pg.GainPE(v3_compressed, 0.5)
+
+    v1_panned = pg.SpatialPE(v1_compressed, method=pg.SpatialLinear(azimuth=-75.0))
+    v2_panned = pg.SpatialPE(v2_compressed, method=pg.SpatialLinear(azimuth=0.0))
+    v3_panned = pg.SpatialPE(v3_attenuated, method=pg.SpatialLinear(azimuth=75.0))
+
+    return pg.MixPE(v1_panned, v2_panned, v3_panned)
+
+
+def build_score(
+    assets: ScoreAssets,
+    sample_rate: int,
+    seed: int = SEED,
+    freeze_root: Optional[Path] = None,
+) -> ScoreGraph:
+    """
+    Build the score's tracks from `assets`.  Slices are looped and IR
+    spectra computed here, and the voices and crowd are frozen (bounced, or
+    read back from `freeze_root`) as they are built.
+
+    The strum timings of the plings are drawn from `seed`.  The whalesong's
+    pan walk (pg.RandomPE) and the drum choices (pg.RandomSelectPE) use
+    pygmu2's own random numbers, so they differ from run to run.
+    """
+    def b2samp(beats):
+        return beats_to_samples(beats, sample_rate)
+
+    samples_per_beat = SECONDS_PER_BEAT * sample_rate
+    ir_10 = assets.ir('synthetic_ir_10')
+
+    # --------------------------------------------------------------------------
+    # bubbles_track
+
+    bubbles_stream = assets.slice('bubbles_0_125')
+    bubble_loop_1 = MaterializedLoopPE(bubbles_stream)
+    bubble_loop_2 = pg.DelayPE(bubble_loop_1, int(bubbles_stream.extent().end/2))
+    bubbles_left = pg.SpatialPE(bubble_loop_1, method=pg.SpatialLinear(azimuth=-75.0))
+    bubbles_right = pg.SpatialPE(bubble_loop_2, method=pg.SpatialLinear(azimuth=75.0))
+    bubbles_stereo = pg.MixPE(bubbles_left, bubbles_right)
+    bubbles_track = bubbles_stereo
+
+    # --------------------------------------------------------------------------
+    # foghorn_track
+
+    foghorn_stream = MaterializedLoopPE(assets.slice('foghorns'))
+    foghorn_track = foghorn_stream
+
+    # --------------------------------------------------------------------------
+    # snores_track
+
+    # Filter the slice once and loop the result, rather than filtering the
+    # loop on every pass
+    snoring_stream = MaterializedLoopPE(highpass_4th_order(assets.slice('snores'), 120))
+    snores_track = snoring_stream
+
+    # --------------------------------------------------------------------------
+    # whalesong_track
+
+    wandering_whalesong = ConstantPowerPanPE(
+        pg.LoopPE(make_whalesong(assets, sample_rate)),
+        azimuth=ControlRatePE(
+            pg.RandomPE(
+                min_value=-80.0,
+                max_value=80.0,
+                mode=pg.RandomMode.WALK,
+                slew=0.001 * math.sqrt(WHALESONG_PAN_PERIOD)),
+            period=WHALESONG_PAN_PERIOD)
+        )
+
+    # reverb comes from the shared 'ir_10' bus, see "Reverb buses" below
+    whalesong_track = wandering_whalesong
+
+    # --------------------------------------------------------------------------
+    # drums_track
+
+    drums = [assets.slice(name) for name in DRUM_SLICES]
+
+    trigger_pattern = pg.PiecewisePE(
+        [
+        (b2samp(0), 1.0), (b2samp(2)-2, 1.0), (b2samp(2)-1, 0.0),
+        (b2samp(2), 1.0), (b2samp(4)-2, 1.0), (b2samp(4)-1, 0.0),
+        (b2samp(4), 1.0), (b2samp(6)-2, 1.0), (b2samp(6)-1, 0.0),
+        (b2samp(14)-1, 0.0)],
+        transition_type=pg.TransitionType.STEP,
+        )
+    drums_chosen = pg.RandomSelectPE(
+        trigger=pg.LoopPE(trigger_pattern),
+        inputs=drums,
+        trigger_mode=pg.TriggerMode.RETRIGGER
+        )
+    drums_loop = pg.LoopPE(pg.SetExtentPE(drums_chosen, 0, b2samp(14)))
+
+    drums_track = pg.SetExtentPE(drums_loop, 0, None)
+
+    # --------------------------------------------------------------------------
+    # plings_track
+
+    # reverb comes from the shared 'ir_10' bus, see "Reverb buses" below
+    dry_chords = generate_stacked_chords(
+        assets, PLING_STACKS, sample_rate, rng=random.Random(seed))
+    plings_track = dry_chords
+
+    # --------------------------------------------------------------------------
+    # voices_track
+
+    voices_dry = make_voices(assets, sample_rate)
+    # Frozen to CACHE_DIR/frozen: re-runs read the compressed, reverberated
+    # voices from a file until a slice or parameter above changes
+    voices_wet = FreezePE(
+        PartitionedConvolutionPE(voices_dry, assets.ir('small_prehistoric_cave'), mix = 0.3),
+        root=freeze_root)
+    voices_track = voices_wet
+
+    # --------------------------------------------------------------------------
+    # crowd_track
+
+    crowd = assets.slice('crowd')
+    crowd_wet = FreezePE(PartitionedConvolutionPE(
+        crowd,
+        assets.ir('small_plate'),
+        mix = 0.6
+        ), root=freeze_root)
+    crowd_track = crowd_wet
+
+    # --------------------------------------------------------------------------
+    # submixes:
+    #
+    # individual tracks are delayed until their start time
+    # ramp breakpoints, etc, are expressed in absolute time.
+
+    bubbles_dly = pg.DelayPE(bubbles_track, b2samp(0))
+    bubbles_mix = AutomatedGainPE(bubbles_dly, [
+        (0, -30.0),   # holdoff
+        (10, 0.0),    # complete ramp up
+        (38+37.5, 0.0),    # here, hold this (duck)
+        (38+38, -10.0),
+        (38+43, 0.0),
+        (38+68, -20.0),   # ramp down
+        (110, -20.0),   # start ramp down
+        (115, -60),   # complete ramp down
+        ], samples_per_beat=samples_per_beat)
+
+    foghorn_dly = pg.DelayPE(foghorn_track, b2samp(5))
+    foghorn_mix = AutomatedGainPE(foghorn_dly, [
+        (0, -30.0),   # holdoff
+        (5, -30),     # start ramp up
+        (10, 0.0),    # complete ramp up
+        (38+37.5, 0.0),    # here, hold this (duck)
+        (38+38, -10.0),
+        (38+43, 0.0),
+        (110, 0.0),   # start ramp down
+        (115, -60),   # complete ramp down
+        ], samples_per_beat=samples_per_beat)
+
+    snores_dly = pg.DelayPE(snores_track, b2samp(5))
+    snores_mix = AutomatedGainPE(snores_dly, [
+        (0, -40.0),   # holdoff
+        (5, -40),     # start ramp up
+        (20, -20.0),    # complete ramp up
+        (38+37.5, -20.0),    # here, hold this (start duck)
+        (38+38, -60.0),    # ramp down, stay down for rest of piece
+        (115, -60),   # complete ramp down
+        ], samples_per_beat=samples_per_beat)
+
+    whalesong_dly = pg.DelayPE(whalesong_track, b2samp(10))
+    whalesong_mix = AutomatedGainPE(whalesong_dly, [
+        (0, -30.0),   # holdoff
+        (10, -30),    # start ramp up
+        (15, 0.0),    # complete ramp up
+        (38+37.5, 0.0),    # here, hold this (duck)
+        (38+38, -10.0),
+        (38+43, 0.0),
+        (110, 0.0),   # start ramp down
+        (115, -60),   # complete ramp down
+        ], samples_per_beat=samples_per_beat)
+
+    drums_dly = pg.DelayPE(drums_track, b2samp(15))
+    drums_mix = pg.SetExtentPE(drums_dly, b2samp(15), b2samp(90))
+
+    plings_dly = pg.DelayPE(plings_track, b2samp(22.5))
+    plings_mix = plings_dly
+
+    voices_dly = pg.DelayPE(voices_track, b2samp(38))
+    voices_mix = voices_dly
+
+    # start fading in before "this is the skull" at 38 + 54.6 beats"
+    # fade out fast at "to be born" at 38 + 65.5
+    crowd_dly = pg.DelayPE(crowd_track, b2samp(38+52))
+    crowd_mix = AutomatedGainPE(crowd_dly, [
+        (0, -60.0),       # holdoff
+        (38+52, -60.0),   #
+        (38+54, -20.0),   # this is the skull
+        (38+64, 4.0),     # (complete ramp to full)
+        (38+68, -20.0),   # ramp down
+        (115, -60.0),     # end
+        ], samples_per_beat=samples_per_beat)
+
+    # --------------------------------------------------------------------------
+    # Reverb buses
+    #
+    # whalesong and plings share the 10 second IR.  Rather than convolving
+    # each track on its own, both send (post-fader) to one bus that convolves
+    # the sum of its sends once.  The bus is rendered together with its
+    # senders so each sender's dry path and send come from a single render of
+    # the track.
+
+    buses = AuxBuses()
+    buses.add('ir_10', ir_10)
+    whalesong_mix = buses.send('ir_10', whalesong_mix, level=0.6)
+    plings_mix = buses.send('ir_10', plings_mix, level=0.6)
+    ir_10_mix = SparseMixPE(whalesong_mix, plings_mix, buses['ir_10'].return_pe())
+
+    tracks = {
+        'bubbles': bubbles_mix,
+        'foghorn': foghorn_mix,
+        'snores': snores_mix,
+        'whalesong+plings': ir_10_mix,
+        'drums': drums_mix,
+        'voices': voices_mix,
+        'crowd': crowd_mix,
+    }
+    # Nodes are named after the variables above that hold them
+    return ScoreGraph(tracks, variable_names(locals()))
@@ -0,0 +1,73 @@
+"""Content-addressed cache of rendered track stems."""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pygmu2 as pg
+from pygmu2.logger import get_logger
+
+from giantfish.config import CACHE_DIR
+from giantfish.graph_hash import graph_digest
+from giantfish.render import render_to_array
+
+logger = get_logger(__name__)
+
+
+class StemCache:
+    """
+    Cache rendered stems as .npy files under `root` (default CACHE_DIR/stems).
+
+    A stem is keyed by the structural hash of its PE subgraph (including the
+    contents of every asset file it reads), the render window and the sample
+    rate, so editing one track only invalidates that track.
+    """
+
+    def __init__(self, sample_rate: int, root: Optional[Path] = None):
+        self.sample_rate = sample_rate
+        self.root = Path(root) if root is not None else CACHE_DIR / "stems"
+
+    def key(self, source: pg.ProcessingElement, start: int, duration: int) -> str:
+        return graph_digest(source, self.sample_rate, start, duration)
+
+    def path_for(self, key: str) -> Path:
+        return self.root / f"{key}.npy"
+
+    def load(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached stem for `key` (memory-mapped), or None."""
+        path = self.path_for(key)
+        if not path.exists():
+            return None
+        return np.load(path, mmap_mode="r")
+
+    def store(self, key: str, data: np.ndarray) -> Path:
+        """Atomically write `data` as the stem for `key`."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(key)
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, np.ascontiguousarray(data, dtype=np.float32))
+        os.replace(tmp_path, path)
+        return path
+
+    def render(
+        self,
+        name: str,
+        source: pg.ProcessingElement,
+        start: int,
+        duration: int,
+    ) -> np.ndarray:
+        """
+        Return `duration` samples of `source` from `start`, reading them from
+        the cache when the subgraph is unchanged and rendering otherwise.
+        """
+        key = self.key(source, start, duration)
+        data = self.load(key)
+        if data is not None:
+            logger.info(f"Stem '{name}' unchanged, using {self.path_for(key).name}")
+            return data
+        logger.info(f"Rendering stem '{name}'")
+        data = render_to_array(source, start, duration, self.sample_rate)
+        self.store(key, data)
+        return data
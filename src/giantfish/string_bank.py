@@ -0,0 +1,235 @@
+"""A bank of Karplus-Strong plucked strings rendered together."""
+from __future__ import annotations
+
+import math
+from typing import Optional, Sequence
+
+import numpy as np
+import pygmu2 as pg
+from pygmu2.karplus_strong_pe import rho_for_decay_db
+
+# Width of the shared history ring beyond the longest delay line.  Larger
+# means fewer compactions; each compaction copies one delay line per string.
+_RING_SLACK = 8192
+
+
+class KarplusStrongBankPE(pg.SourcePE):
+    """
+    N plucked strings rendered as one mono source.
+
+    String i is plucked at sample `onsets[i]` with a burst of noise one period
+    long and then follows the Karplus-Strong recurrence
+
+        y[n] = rho * (y[n - N] + y[n - N + 1]) / 2
+
+    with N = round(sample_rate / frequency).  Because every output depends
+    only on samples at least N - 1 back, up to N - 1 samples of all sounding
+    strings are computed at once as NumPy array operations instead of one
+    sample (and one PE) at a time.
+
+    `decay_seconds` sets each string's time to fall by 60 dB (converted with
+    `rho_for_decay_db`), unless explicit `rhos` are given.  Per-string
+    arguments may be scalars, which apply to every string.  A string stops
+    once it has decayed below `silence_db`, so the extent is finite when every
+    rho is below 1.
+
+    Like other stateful PEs, this expects contiguous render requests; a
+    non-contiguous request replays the strings still ringing there, so the
+    output never depends on how rendering was blocked.
+    """
+
+    def __init__(
+        self,
+        frequencies: Sequence[float],
+        onsets: Sequence[int],
+        decay_seconds: float | Sequence[float] = 2.0,
+        amplitude: float | Sequence[float] = 1.0,
+        rhos: Optional[float | Sequence[float]] = None,
+        seed: Optional[int] = None,
+        silence_db: float = -90.0,
+    ):
+        super().__init__()
+        self._frequencies = np.asarray(frequencies, dtype=np.float64).ravel()
+        count = len(self._frequencies)
+        if count == 0:
+            raise ValueError("KarplusStrongBankPE needs at least one string")
+        self._onsets = np.broadcast_to(np.asarray(onsets, dtype=np.int64), (count,)).copy()
+        self._decay_seconds = np.broadcast_to(
+            np.asarray(decay_seconds, dtype=np.float64), (count,)).copy()
+        self._amplitudes = np.broadcast_to(
+            np.asarray(amplitude, dtype=np.float64), (count,)).copy()
+        self._rhos = None if rhos is None else np.broadcast_to(
+            np.asarray(rhos, dtype=np.float64), (count,)).copy()
+        self._seed = seed
+        # Without a seed, one is drawn here and saved with the state, so a
+        # render resumed from a checkpoint in another process plucks the
+        # same noise bursts.
+        self._noise_seed = seed if seed is not None else int(np.random.SeedSequence().entropy)
+        self._silence_db = float(silence_db)
+        self._strings: Optional[_StringTables] = None
+        self._reset_state()
+
+    @property
+    def frequencies(self) -> np.ndarray:
+        return self._frequencies
+
+    @property
+    def onsets(self) -> np.ndarray:
+        return self._onsets
+
+    def string_count(self) -> int:
+        return len(self._frequencies)
+
+    def channel_count(self) -> int:
+        return 1
+
+    def is_pure(self) -> bool:
+        return False
+
+    def preroll_samples(self) -> int:
+        # Seeks replay the sounding strings, see _render().
+        return 0
+
+    def _compute_extent(self) -> pg.Extent:
+        strings = self._tables()
+        end = strings.stops.max()
+        return pg.Extent(int(self._onsets.min()), None if math.isinf(end) else int(end))
+
+    def _tables(self) -> _StringTables:
+        if self._strings is None:
+            self._strings = _StringTables(
+                sample_rate=self.sample_rate,
+                frequencies=self._frequencies,
+                onsets=self._onsets,
+                decay_seconds=self._decay_seconds,
+                amplitudes=self._amplitudes,
+                rhos=self._rhos,
+                seed=self._noise_seed,
+                silence_db=self._silence_db)
+        return self._strings
+
+    def _reset_state(self) -> None:
+        self._history: Optional[np.ndarray] = None
+        self._head = 0
+        self._next_start: Optional[int] = None
+
+    def _render(self, start: int, duration: int) -> pg.Snippet:
+        strings = self._tables()
+        if start != self._next_start:
+            self._reset_state()
+            width = int(strings.periods.max()) + _RING_SLACK
+            self._history = np.zeros((strings.count, width), dtype=np.float32)
+            self._head = int(strings.periods.max())
+            # Only strings still sounding at `start` need replaying.
+            ringing = strings.stops > start
+            first = int(self._onsets[ringing].min()) if ringing.any() else start
+            if first < start:
+                self._advance(first, start - first, None)
+        out = np.zeros((duration, 1), dtype=np.float32)
+        self._advance(start, duration, out[:, 0])
+        self._next_start = start + duration
+        return pg.Snippet(start, out)
+
+    def hash_params(self) -> dict:
+        return {
+            "frequencies": self._frequencies, "onsets": self._onsets,
+            "decay_seconds": self._decay_seconds, "amplitude": self._amplitudes,
+            "rhos": self._rhos, "seed": self._seed, "silence_db": self._silence_db}
+
+    def get_state(self) -> dict:
+        return {"history": self._history, "head": self._head, "next_start": self._next_start,
+                "noise_seed": self._noise_seed}
+
+    def set_state(self, state: dict) -> None:
+        if state["noise_seed"] != self._noise_seed:
+            self._noise_seed = state["noise_seed"]
+            self._strings = None
+        self._history = state["history"]
+        self._head = state["head"]
+        self._next_start = state["next_start"]
+
+    def _advance(self, start: int, duration: int, out: Optional[np.ndarray]) -> None:
+        """Run the strings over [start, start + duration), summing into `out`."""
+        strings = self._tables()
+        history = self._history
+        longest = int(strings.periods.max())
+        pos, end = start, start + duration
+        while pos < end:
+            sounding = (strings.onsets <= pos) & (pos < strings.stops)
+            # Chunks end wherever the set of sounding strings changes.
+            upcoming = strings.boundaries[strings.boundaries > pos]
+            limit = min(end, int(upcoming[0])) if len(upcoming) else end
+            active = np.flatnonzero(sounding)
+            n = limit - pos
+            if len(active):
+                n = min(n, int(strings.periods[active].min()) - 1)
+            if self._head + n > history.shape[1]:
+                history[:, :longest] = history[:, self._head - longest:self._head]
+                self._head = longest
+            n = min(n, history.shape[1] - self._head)
+
+            head = self._head
+            history[:, head:head + n] = 0.0
+            if len(active):
+                steps = np.arange(n)
+                periods = strings.periods[active][:, np.newaxis]
+                rows = active[:, np.newaxis]
+                taps = head - periods + steps
+                y = history[rows, taps]
+                y += history[rows, taps + 1]
+                y *= strings.half_rhos[active][:, np.newaxis]
+                # The excitation burst covers the first period after the onset.
+                offsets = pos - strings.onsets[active][:, np.newaxis] + steps
+                plucking = offsets < periods
+                if plucking.any():
+                    y += np.where(
+                        plucking,
+                        strings.excitations[rows, np.minimum(offsets, longest - 1)],
+                        0.0)
+                history[active, head:head + n] = y
+                if out is not None:
+                    out[pos - start:pos - start + n] = y.sum(axis=0)
+            self._head = head + n
+            pos += n
+
+
+class _StringTables:
+    """Per-string constants derived once the sample rate is known."""
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frequencies: np.ndarray,
+        onsets: np.ndarray,
+        decay_seconds: np.ndarray,
+        amplitudes: np.ndarray,
+        rhos: Optional[np.ndarray],
+        seed: Optional[int],
+        silence_db: float,
+    ):
+        self.count = len(frequencies)
+        self.onsets = onsets
+        self.periods = np.maximum(2, np.rint(sample_rate / frequencies)).astype(np.int64)
+        if rhos is None:
+            rhos = np.array([
+                rho_for_decay_db(
+                    seconds=seconds,
+                    frequency=frequency,
+                    sample_rate=sample_rate,
+                    db=-60)
+                for seconds, frequency in zip(decay_seconds, frequencies)])
+        self.half_rhos = (0.5 * rhos).astype(np.float32)
+
+        # The envelope falls by a factor of rho (at least) every period.
+        silence = 10.0 ** (silence_db / 20.0)
+        with np.errstate(divide="ignore"):
+            periods_to_silence = np.where(
+                rhos < 1.0, np.log(silence) / np.log(np.minimum(rhos, 1.0 - 1e-12)), np.inf)
+        self.stops = onsets + self.periods * (1.0 + np.ceil(periods_to_silence))
+        self.boundaries = np.unique(np.concatenate([onsets, self.stops[np.isfinite(self.stops)]]))
+
+        rng = np.random.default_rng(seed)
+        longest = int(self.periods.max())
+        self.excitations = np.zeros((self.count, longest), dtype=np.float32)
+        for i, (period, amplitude) in enumerate(zip(self.periods, amplitudes)):
+            self.excitations[i, :period] = amplitude * rng.uniform(-1.0, 1.0, period)
@@ -0,0 +1,131 @@
+"""WAV file writing on a background I/O thread."""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from typing import Optional
+
+import numpy as np
+
+from giantfish.wavfile import WAV_HEADER_SIZE, write_wav_header
+
+# Blocks that may wait for the I/O thread before write() blocks.
+DEFAULT_QUEUE_BLOCKS = 16
+
+# Sample formats by name: (bits per sample, is float)
+FORMATS = {
+    "float32": (32, True),
+    "pcm24": (24, False),
+    "pcm16": (16, False),
+}
+
+
+def _encode(block: np.ndarray, bits_per_sample: int, is_float: bool) -> bytes:
+    """Interleaved little-endian sample bytes for a (frames, channels) block."""
+    if is_float:
+        return np.ascontiguousarray(block, dtype="<f4").tobytes()
+    scale = float((1 << (bits_per_sample - 1)) - 1)
+    ints = np.rint(np.clip(block, -1.0, 1.0) * scale)
+    if bits_per_sample == 16:
+        return ints.astype("<i2").tobytes()
+    # 24-bit: the low three bytes of each little-endian int32
+    return ints.astype("<i4").view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+
+
+class ThreadedWavWriter:
+    """
+    Write (frames, channels) float blocks to a WAV file from a dedicated I/O
+    thread, so the thread rendering them never waits on the filesystem.
+
+    `write()` copies each block into a bounded queue (blocking only when
+    `queue_blocks` blocks are already waiting); the I/O thread converts them
+    to `format` ("float32", "pcm24" or "pcm16") and writes them.  If the
+    length is known up front (`frames`), the file is preallocated.  `close()`
+    drains the queue, fixes up the header for the frames actually written
+    and re-raises any error from the I/O thread.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike,
+        channels: int,
+        sample_rate: int,
+        frames: Optional[int] = None,
+        format: str = "float32",
+        queue_blocks: int = DEFAULT_QUEUE_BLOCKS,
+    ):
+        if format not in FORMATS:
+            raise ValueError(f"unknown format '{format}', expected one of {', '.join(FORMATS)}")
+        self.path = os.fspath(path)
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.format = format
+        self._bits, self._is_float = FORMATS[format]
+        self._frames = 0
+        self._error: Optional[BaseException] = None
+        self._file = open(self.path, "wb")
+        write_wav_header(
+            self._file, frames or 0, channels, sample_rate, self._bits, self._is_float)
+        if frames:
+            size = WAV_HEADER_SIZE + frames * channels * (self._bits // 8)
+            try:
+                os.posix_fallocate(self._file.fileno(), 0, size)
+            except (AttributeError, OSError):
+                self._file.truncate(size)
+        self._queue: queue.Queue[Optional[np.ndarray]] = queue.Queue(maxsize=queue_blocks)
+        self._thread = threading.Thread(
+            target=self._drain, name=f"wav-writer {os.path.basename(self.path)}", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> ThreadedWavWriter:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def frames(self) -> int:
+        """Frames handed to write() so far."""
+        return self._frames
+
+    def write(self, data: np.ndarray) -> None:
+        if self._error is not None:
+            raise self._error
+        block = np.array(data, dtype=np.float32)
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+        if block.shape[1] != self.channels:
+            raise ValueError(f"expected {self.channels} channels, got {block.shape[1]}")
+        self._frames += len(block)
+        self._queue.put(block)
+
+    def _drain(self) -> None:
+        while True:
+            block = self._queue.get()
+            if block is None:
+                return
+            if self._error is not None:
+                continue  # keep draining so write() never blocks forever
+            try:
+                self._file.write(_encode(block, self._bits, self._is_float))
+            except BaseException as e:
+                self._error = e
+
+    def close(self) -> None:
+        if self._file.closed:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        try:
+            if self._error is None:
+                self._file.seek(0)
+                write_wav_header(
+                    self._file, self._frames, self.channels, self.sample_rate,
+                    self._bits, self._is_float)
+                self._file.truncate(
+                    WAV_HEADER_SIZE + self._frames * self.channels * (self._bits // 8))
+        finally:
+            self._file.close()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,200 @@
+"""Memory-mapped WAV file reading, and float WAV writing."""
+from __future__ import annotations
+
+import os
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+
+import numpy as np
+import pygmu2 as pg
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_IEEE_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+@dataclass(frozen=True)
+class WavInfo:
+    sample_rate: int
+    channels: int
+    bits_per_sample: int
+    is_float: bool
+    data_offset: int
+    frames: int
+
+
+def read_wav_info(path: str | os.PathLike) -> WavInfo:
+    """Parse the header of a PCM or IEEE float RIFF/WAVE file."""
+    with open(path, "rb") as f:
+        riff, _, wave = struct.unpack("<4sI4s", f.read(12))
+        if riff != b"RIFF" or wave != b"WAVE":
+            raise ValueError(f"{path}: not a RIFF/WAVE file")
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path}: no data chunk")
+            chunk_id, size = struct.unpack("<4sI", header)
+            if chunk_id == b"fmt ":
+                fmt = f.read(size)
+            elif chunk_id == b"data":
+                data_offset = f.tell()
+                break
+            else:
+                f.seek(size, os.SEEK_CUR)
+            if size % 2:
+                f.seek(1, os.SEEK_CUR)
+        file_size = os.fstat(f.fileno()).st_size
+
+    if fmt is None:
+        raise ValueError(f"{path}: no fmt chunk before data chunk")
+    format_tag, channels, sample_rate, _, block_align, bits = struct.unpack("<HHIIHH", fmt[:16])
+    if format_tag == _WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        format_tag = struct.unpack("<H", fmt[24:26])[0]
+    if format_tag not in (_WAVE_FORMAT_PCM, _WAVE_FORMAT_IEEE_FLOAT):
+        raise ValueError(f"{path}: unsupported WAV format 0x{format_tag:04x}")
+    # Writers that stream often leave the data size unset; trust the file size.
+    frames = (file_size - data_offset) // block_align
+    if size and size != 0xFFFFFFFF:
+        frames = min(frames, size // block_align)
+    return WavInfo(
+        sample_rate=sample_rate,
+        channels=channels,
+        bits_per_sample=bits,
+        is_float=format_tag == _WAVE_FORMAT_IEEE_FLOAT,
+        data_offset=data_offset,
+        frames=frames)
+
+
+def _sample_dtype(info: WavInfo) -> np.dtype:
+    if info.is_float:
+        return {32: np.dtype("<f4"), 64: np.dtype("<f8")}[info.bits_per_sample]
+    return {8: np.dtype("u1"), 16: np.dtype("<i2"), 24: np.dtype("u1"),
+            32: np.dtype("<i4")}[info.bits_per_sample]
+
+
+class MmapWavReaderPE(pg.SourcePE):
+    """
+    A WAV file source that memory-maps the sample data instead of reading it
+    into memory, so resident memory stays flat no matter how long the file.
+
+    For 32-bit float files a render block is a zero-copy view of the mapping.
+    The mapping is read-only, so a consumer that writes into its input in
+    place fails loudly rather than corrupting every later read of those
+    samples.  Other formats (8/16/24/32 bit PCM, 64-bit float) convert only
+    the requested window to float32.
+
+    If `channels` is given, a mono file is duplicated to that many channels
+    so no separate channel adapter is needed.
+    """
+
+    def __init__(self, path: str | os.PathLike, channels: Optional[int] = None):
+        super().__init__()
+        self._path = os.fspath(path)
+        self._info = read_wav_info(self._path)
+        if channels is not None and channels != self._info.channels and self._info.channels != 1:
+            raise ValueError(
+                f"{self._path}: can't map {self._info.channels} channels to {channels}")
+        self._channels = channels if channels is not None else self._info.channels
+        info = self._info
+        width = 3 if info.bits_per_sample == 24 and not info.is_float else 1
+        shape = (info.frames, info.channels, 3) if width == 3 else (info.frames, info.channels)
+        self._samples = np.memmap(
+            self._path, dtype=_sample_dtype(info), mode="r",
+            offset=info.data_offset, shape=shape)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def file_sample_rate(self) -> int:
+        return self._info.sample_rate
+
+    @property
+    def info(self) -> WavInfo:
+        return self._info
+
+    def __repr__(self) -> str:
+        info = self._info
+        kind = "float" if info.is_float else "pcm"
+        return (f"MmapWavReaderPE({self._path!r}, {info.sample_rate} Hz, "
+                f"{info.channels} ch, {kind}{info.bits_per_sample})")
+
+    def _compute_extent(self) -> pg.Extent:
+        return pg.Extent(0, self._info.frames)
+
+    def channel_count(self) -> int:
+        return self._channels
+
+    def is_pure(self) -> bool:
+        return True
+
+    def _to_float(self, lo: int, hi: int) -> np.ndarray:
+        raw = self._samples[lo:hi]
+        info = self._info
+        if info.is_float:
+            data = raw if raw.dtype == np.float32 else raw.astype(np.float32)
+        elif info.bits_per_sample == 8:
+            data = (raw.astype(np.float32) - 128.0) * (1.0 / 128.0)
+        elif info.bits_per_sample == 16:
+            data = raw.astype(np.float32) * (1.0 / 32768.0)
+        elif info.bits_per_sample == 24:
+            as_int = (raw[..., 0].astype(np.int32)
+                      | (raw[..., 1].astype(np.int32) << 8)
+                      | (raw[..., 2].astype(np.int8).astype(np.int32) << 16))
+            data = as_int.astype(np.float32) * (1.0 / 8388608.0)
+        else:
+            data = raw.astype(np.float32) * (1.0 / 2147483648.0)
+        if data.shape[1] != self._channels:
+            data = np.repeat(data, self._channels, axis=1)
+        return data
+
+    def _render(self, start: int, duration: int) -> pg.Snippet:
+        frames = self._info.frames
+        if start >= 0 and start + duration <= frames:
+            return pg.Snippet(start, self._to_float(start, start + duration))
+        out = np.zeros((duration, self._channels), dtype=np.float32)
+        lo = max(start, 0)
+        hi = min(start + duration, frames)
+        if lo < hi:
+            out[lo - start:hi - start] = self._to_float(lo, hi)
+        return pg.Snippet(start, out)
+
+
+# Bytes before the sample data in files written by write_wav_header()
+WAV_HEADER_SIZE = 44
+
+
+def write_wav_header(
+    f: BinaryIO,
+    frames: int,
+    channels: int,
+    sample_rate: int,
+    bits_per_sample: int = 32,
+    is_float: bool = True,
+) -> None:
+    """
+    Write the header of a WAV file of `frames` frames (32-bit float by
+    default, else integer PCM); the interleaved little-endian samples follow.
+    """
+    width = bits_per_sample // 8
+    data_size = frames * channels * width
+    format_tag = _WAVE_FORMAT_IEEE_FLOAT if is_float else _WAVE_FORMAT_PCM
+    f.write(struct.pack("<4sI4s", b"RIFF", 36 + data_size, b"WAVE"))
+    f.write(struct.pack(
+        "<4sIHHIIHH", b"fmt ", 16, format_tag, channels,
+        sample_rate, sample_rate * channels * width, channels * width, bits_per_sample))
+    f.write(struct.pack("<4sI", b"data", data_size))
+
+
+def write_wav(path: str | os.PathLike, data: np.ndarray, sample_rate: int) -> None:
+    """Write a (frames, channels) array as a 32-bit float WAV file."""
+    data = np.asarray(data, dtype="<f4")
+    if data.ndim == 1:
+        data = data[:, np.newaxis]
+    frames, channels = data.shape
+    with open(path, "wb") as f:
+        write_wav_header(f, frames, channels, sample_rate)
+        f.write(np.ascontiguousarray(data).tobytes())
@@ -0,0 +1,98 @@
+"""A source behind a reverb bus's send sees one contiguous pass, even
+under CheckpointStore and with a track that starts off the block grid."""
+from __future__ import annotations
+
+import numpy as np
+import pygmu2 as pg
+import pytest
+
+from giantfish import ir_cache
+from giantfish.aux_bus import AuxBuses
+from giantfish.buffer_pe import BufferPE
+from giantfish.checkpoint import CheckpointStore
+from giantfish.sparse_mix import SparseMixPE
+
+SAMPLE_RATE = 48000
+
+
+class RandomWalkPE(pg.SourcePE):
+    """A stateful source that records the windows it is asked for."""
+
+    def __init__(self, duration: int, seed: int = 1):
+        super().__init__()
+        self._duration = duration
+        self._rng = np.random.default_rng(seed)
+        self._value = 0.0
+        self.requests: list[tuple[int, int]] = []
+
+    def _compute_extent(self) -> pg.Extent:
+        return pg.Extent(0, self._duration)
+
+    def channel_count(self) -> int:
+        return 1
+
+    def is_pure(self) -> bool:
+        return False
+
+    def _render(self, start: int, duration: int) -> pg.Snippet:
+        self.requests.append((start, duration))
+        walk = self._value + np.cumsum(self._rng.normal(0.0, 0.01, duration))
+        self._value = float(walk[-1])
+        return pg.Snippet(start, walk.astype(np.float32)[:, np.newaxis])
+
+
+def _seeks(requests: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Requests that don't start where the one before ended."""
+    return [
+        (start, duration)
+        for (prev_start, prev_duration), (start, duration) in zip(requests, requests[1:])
+        if start != prev_start + prev_duration]
+
+
+def _score(track_start: int) -> tuple[RandomWalkPE, RandomWalkPE, pg.ProcessingElement]:
+    whalesong = RandomWalkPE(3 * SAMPLE_RATE, seed=1)
+    plings = RandomWalkPE(2 * SAMPLE_RATE, seed=2)
+    ir = np.random.default_rng(3).normal(0.0, 0.1, (SAMPLE_RATE // 2, 1))
+    buses = AuxBuses()
+    buses.add("room", BufferPE(ir))
+    dry = [
+        buses.send("room", pg.DelayPE(whalesong, track_start), 0.4),
+        buses.send("room", pg.DelayPE(plings, track_start + SAMPLE_RATE), 0.2),
+    ]
+    return whalesong, plings, SparseMixPE(*dry, *buses.returns().values())
+
+
+@pytest.fixture(autouse=True)
+def _ir_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ir_cache, "IR_CACHE_DIR", tmp_path / "ir_spectra")
+
+
+@pytest.mark.parametrize("block_size", [1000, 4096])
+def test_sends_render_contiguously_under_checkpoint_store(tmp_path, block_size):
+    whalesong, plings, mix = _score(track_start=12_347)
+    store = CheckpointStore(
+        mix, SAMPLE_RATE, interval=2 * SAMPLE_RATE, block_size=block_size,
+        root=tmp_path / "checkpoints")
+    store.render(0, mix.extent().end)
+
+    assert _seeks(whalesong.requests) == []
+    assert _seeks(plings.requests) == []
+    assert store.positions()
+
+
+@pytest.mark.parametrize("block_size", [1000, 4096])
+def test_resumed_render_matches_full_render(tmp_path, block_size):
+    whalesong, plings, mix = _score(track_start=12_347)
+    store = CheckpointStore(
+        mix, SAMPLE_RATE, interval=2 * SAMPLE_RATE, block_size=block_size,
+        root=tmp_path / "checkpoints")
+    end = mix.extent().end
+    full = store.render(0, end)
+
+    # Restoring the checkpoint rewinds the sources' request logs too.
+    start = store.positions()[-1] + 1000
+    resumed = store.render(start, end)
+
+    np.testing.assert_array_equal(resumed, full[start:])
+    assert _seeks(whalesong.requests) == []
+    assert _seeks(plings.requests) == []
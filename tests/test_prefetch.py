@@ -0,0 +1,70 @@
+"""prefetch_assets() against a DirectoryAssetManager, without Google Drive."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from giantfish.prefetch import DirectoryAssetManager, PrefetchError, prefetch_assets
+
+
+class FlakyAssetManager(DirectoryAssetManager):
+    """Fails the first `failures` loads of each asset with a ConnectionError."""
+
+    def __init__(self, root: Path, failures: int = 0):
+        super().__init__(root)
+        self.failures = failures
+        self.calls: dict[str, int] = {}
+
+    def load_asset(self, name: str) -> Path:
+        calls = self.calls[name] = self.calls.get(name, 0) + 1
+        if calls <= self.failures:
+            raise ConnectionError(f"lost connection fetching {name}")
+        return super().load_asset(name)
+
+
+@pytest.fixture
+def assets(tmp_path) -> Path:
+    for name in ("a.wav", "sub/b.wav"):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"RIFF")
+    return tmp_path
+
+
+def test_prefetch_returns_paths_in_order(assets):
+    seen = []
+    paths = prefetch_assets(
+        DirectoryAssetManager(assets), ["sub/b.wav", "a.wav", "sub/b.wav"],
+        progress=lambda completed, total, name: seen.append((completed, total)))
+
+    assert paths == {"sub/b.wav": assets / "sub/b.wav", "a.wav": assets / "a.wav"}
+    assert list(paths) == ["sub/b.wav", "a.wav"]
+    assert sorted(seen) == [(1, 2), (2, 2)]
+
+
+def test_prefetch_retries_transient_errors(assets):
+    manager = FlakyAssetManager(assets, failures=2)
+    paths = prefetch_assets(manager, ["a.wav", "sub/b.wav"], retries=2, backoff=0.0)
+
+    assert paths["a.wav"] == assets / "a.wav"
+    assert manager.calls == {"a.wav": 3, "sub/b.wav": 3}
+
+
+def test_prefetch_gives_up_after_retries(assets):
+    manager = FlakyAssetManager(assets, failures=3)
+    with pytest.raises(PrefetchError) as raised:
+        prefetch_assets(manager, ["a.wav"], retries=2, backoff=0.0, progress=None)
+
+    assert isinstance(raised.value.failures["a.wav"], ConnectionError)
+    assert manager.calls == {"a.wav": 3}
+
+
+def test_missing_asset_fails_without_retrying(assets):
+    manager = FlakyAssetManager(assets)
+    with pytest.raises(PrefetchError) as raised:
+        prefetch_assets(manager, ["a.wav", "missing.wav"], retries=2, backoff=10.0)
+
+    assert list(raised.value.failures) == ["missing.wav"]
+    assert isinstance(raised.value.failures["missing.wav"], FileNotFoundError)
+    assert manager.calls == {"a.wav": 1, "missing.wav": 1}
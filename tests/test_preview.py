@@ -0,0 +1,54 @@
+"""PreviewRenderer played through a recording NullAudioSink."""
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+from giantfish.buffer_pe import BufferPE
+from giantfish.preview import NullAudioSink, PreviewRenderer
+
+SAMPLE_RATE = 48000
+BLOCK_SIZE = 256
+
+
+def _ramp(frames: int) -> np.ndarray:
+    # No zero samples, so silence in the output can only be padding
+    ramp = np.arange(1, frames + 1, dtype=np.float32) / frames
+    return np.stack([ramp, -ramp], axis=1)
+
+
+def test_plays_the_source_unchanged():
+    data = _ramp(20 * BLOCK_SIZE + 100)
+    sink = NullAudioSink(speed=50, record=True)
+    renderer = PreviewRenderer(BufferPE(data), SAMPLE_RATE, sink=sink, block_size=BLOCK_SIZE)
+    renderer.play()
+
+    out = sink.output()
+    assert renderer.underruns == 0
+    np.testing.assert_array_equal(out[:len(data)], data)
+    assert not out[len(data):].any()
+
+
+def test_seek_resumes_at_the_new_position():
+    data = _ramp(10 * SAMPLE_RATE)
+    seek_to = 5 * BLOCK_SIZE
+    sink = NullAudioSink(speed=50, record=True)
+    renderer = PreviewRenderer(BufferPE(data), SAMPLE_RATE, sink=sink, block_size=BLOCK_SIZE)
+    renderer.start()
+    try:
+        while renderer.position < 40 * BLOCK_SIZE:
+            time.sleep(0.001)
+        renderer.seek(seek_to)
+        assert renderer.wait(timeout=30.0)
+    finally:
+        renderer.stop()
+
+    # Drop padding from any underruns while the buffer refilled after the
+    # seek; what's left is a prefix of the source, then the rest from seek_to.
+    out = sink.output()
+    out = out[out.any(axis=1)]
+    played = len(out) - (len(data) - seek_to)
+    assert played >= 40 * BLOCK_SIZE
+    np.testing.assert_array_equal(out[:played], data[:played])
+    np.testing.assert_array_equal(out[played:], data[seek_to:])